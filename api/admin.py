@@ -1,7 +1,7 @@
 from django.contrib import admin
 
 from api.models import Player, Team, PlayerMembership, UserProfile, Comment, Match, TeamInvitation, MatchPerformance, \
-    PlayerRecords, UserFriendship, UserFriendshipInvitation
+    PlayerRecords, UserFriendship, UserFriendshipInvitation, PerformanceTotals
 
 
 class PlayerMembershipInline(admin.TabularInline):
@@ -53,7 +53,7 @@ class MatchAdmin(admin.ModelAdmin):
               'set5_team2_score')
     list_display = ('id', 'team1', 'team2', 'time', 'set1_team1_score', 'set2_team1_score', 'set3_team1_score',
                     'set4_team1_score', 'set5_team1_score', 'set1_team2_score', 'set2_team2_score', 'set3_team2_score',
-                    'set4_team2_score', 'set5_team2_score')
+                    'set4_team2_score', 'set5_team2_score', 'team1_sets', 'team2_sets', 'winner')
 
 
 @admin.register(MatchPerformance)
@@ -79,6 +79,13 @@ class PlayerRecordsAdmin(admin.ModelAdmin):
                     'spike_point_match', 'block_amount', 'block_amount_match', 'dig', 'dig_match',)
 
 
+@admin.register(PerformanceTotals)
+class PerformanceTotalsAdmin(admin.ModelAdmin):
+    list_display = ('id', 'player', 'team', 'performances', 'sets_played', 'serve', 'serve_error', 'serve_ace',
+                    'reception', 'positive_reception', 'reception_error', 'spike', 'spike_point', 'spike_block',
+                    'spike_error', 'block_amount', 'dig',)
+
+
 @admin.register(UserFriendship)
 class UserFriendshipAdmin(admin.ModelAdmin):
     fields = ('user1', 'user2')
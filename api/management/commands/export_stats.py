@@ -0,0 +1,37 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services.stats_export import EXPORTS, OUTPUTS, export_lines, parse_export_filters
+
+
+class Command(BaseCommand):
+    help = 'Streams match performances or matches as CSV or NDJSON, performance CSVs can be read by import_stats'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=EXPORTS)
+        parser.add_argument('--output', choices=OUTPUTS, default='csv')
+        parser.add_argument('--file', help='Written instead of the standard output')
+        parser.add_argument('--team', help='Only rows of the given team')
+        parser.add_argument('--player', help='Only rows of the given player')
+        parser.add_argument('--from', dest='from', help='First day, YYYY-MM-DD')
+        parser.add_argument('--to', help='Last day, YYYY-MM-DD')
+        parser.add_argument('--season', help='Season starting in the given year')
+
+    def handle(self, *args, **options):
+        try:
+            filters = parse_export_filters(options)
+        except ValueError as e:
+            raise CommandError(f'Wrong filter {e}')
+
+        start, lines = perf_counter(), 0
+        rows = export_lines(options['kind'], options['output'], **filters)
+        if not options['file']:
+            for line in rows:
+                self.stdout.write(line, ending='')
+            return
+        with open(options['file'], 'w', newline='') as file:
+            for line in rows:
+                file.write(line)
+                lines += 1
+        self.stdout.write(self.style.SUCCESS(f'Exported {lines} lines in {perf_counter() - start:.2f}s'))
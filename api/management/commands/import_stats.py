@@ -0,0 +1,61 @@
+from itertools import islice
+from time import perf_counter
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services.performance_totals import rebuild_totals
+from api.services.player_records import recompute_player_records
+from api.services.ratings import RatingsError, recompute_ratings
+from api.services.stats_import import FORMATS, StatsImporter, StatsImportError, batches, detect_format, \
+    read_checkpoint, read_rows, write_checkpoint
+
+
+class Command(BaseCommand):
+    help = 'Imports match performances from a CSV or JSON Lines stat sheet, creating missing teams, players and matches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension')
+        parser.add_argument('--owner', help='Username owning the teams the import creates')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows written in one transaction')
+        parser.add_argument('--checkpoint', help='File keeping the count of imported rows, defaults to '
+                                                 'PATH.checkpoint')
+        parser.add_argument('--resume', action='store_true', help='Skip the rows imported before the checkpoint')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        checkpoint = options['checkpoint'] or path + '.checkpoint'
+        owner = None
+        if options['owner']:
+            try:
+                owner = User.objects.get(username=options['owner'])
+            except User.DoesNotExist:
+                raise CommandError(f'User {options["owner"]} does not exist')
+
+        try:
+            format = options['format'] or detect_format(path)
+            skipped = read_checkpoint(checkpoint) if options['resume'] else 0
+            importer = StatsImporter(owner=owner)
+            imported, start = 0, perf_counter()
+            with open(path, newline='') as file:
+                rows = islice(read_rows(file, format), skipped, None)
+                for batch in batches(rows, options['batch_size']):
+                    importer.import_batch(batch, first_row=skipped + imported + 1)
+                    imported += len(batch)
+                    write_checkpoint(checkpoint, skipped + imported)
+                    self.stdout.write(f'{skipped + imported} rows, {imported / (perf_counter() - start):.0f} rows/s')
+        except (OSError, StatsImportError) as e:
+            raise CommandError(str(e))
+        elapsed = perf_counter() - start
+
+        # derived data is rebuilt once instead of after every batch
+        self.stdout.write('Rebuilding performance totals, player records and ratings')
+        rebuild_totals()
+        recompute_player_records()
+        try:
+            recompute_ratings()
+        except RatingsError as e:
+            self.stderr.write(f'{e}, run recompute_ratings once it is installed')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} rows in {elapsed:.2f}s, {imported / elapsed if elapsed else 0:.0f} rows/s'))
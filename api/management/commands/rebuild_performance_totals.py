@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services.performance_totals import find_totals_mismatches, rebuild_totals
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the per player, per team and per player in team performance totals from match performances'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only compare stored totals with match performances, exit with an error on mismatch')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            mismatches = find_totals_mismatches()
+            for (player_id, team_id), stored, expected in mismatches:
+                self.stderr.write(f'player={player_id} team={team_id} stored={stored} expected={expected}')
+            if mismatches:
+                raise CommandError(f'{len(mismatches)} performance totals do not match match performances')
+            self.stdout.write(self.style.SUCCESS('Performance totals match match performances'))
+            return
+
+        rows = rebuild_totals()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} performance totals'))
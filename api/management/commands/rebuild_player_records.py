@@ -0,0 +1,22 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from api.models import PlayerRecords
+from api.services.player_records import recompute_player_records
+
+
+class Command(BaseCommand):
+    help = 'Recomputes every player record and the match it was set in from match performances'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--player', type=int, action='append', dest='players',
+                            help='Recompute only the given player, can be repeated')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        start = perf_counter()
+        recompute_player_records(options['players'], batch_size=options['batch_size'])
+        records = PlayerRecords.objects.count()
+        self.stdout.write(self.style.SUCCESS(f'Recomputed player records, {records} stored in '
+                                             f'{perf_counter() - start:.2f}s'))
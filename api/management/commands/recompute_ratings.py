@@ -0,0 +1,19 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services.ratings import RatingsError, recompute_ratings
+
+
+class Command(BaseCommand):
+    help = 'Recomputes every team and player rating by replaying the finished matches in the order they were played'
+
+    def handle(self, *args, **options):
+        start = perf_counter()
+        try:
+            counts = recompute_ratings()
+        except RatingsError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f'Rated {counts["matches"]} matches and {counts["performances"]} performances of {counts["teams"]} teams '
+            f'and {counts["players"]} players in {perf_counter() - start:.2f}s'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from api.services.stats_cache import get_counters, invalidate_all_stats, reset_counters
+
+
+class Command(BaseCommand):
+    help = 'Shows the hit and miss counters of the computed stats cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after showing them')
+        parser.add_argument('--clear', action='store_true', help='Invalidate every cached stat')
+
+    def handle(self, *args, **options):
+        hits, misses = get_counters()
+        lookups = hits + misses
+        ratio = hits / lookups if lookups else 0
+        self.stdout.write(f'hits: {hits}, misses: {misses}, hit ratio: {ratio:.1%}')
+        if options['reset']:
+            reset_counters()
+        if options['clear']:
+            invalidate_all_stats()
+            self.stdout.write(self.style.SUCCESS('Invalidated every cached stat'))
@@ -0,0 +1,165 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:58
+
+import api.models
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0004_remove_player_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Match',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('time', models.DateTimeField()),
+                ('set1_team1_score', models.PositiveSmallIntegerField(default=0)),
+                ('set2_team1_score', models.PositiveSmallIntegerField(default=0)),
+                ('set3_team1_score', models.PositiveSmallIntegerField(default=0)),
+                ('set4_team1_score', models.PositiveSmallIntegerField(blank=True, default=0, null=True)),
+                ('set5_team1_score', models.PositiveSmallIntegerField(blank=True, default=0, null=True)),
+                ('set1_team2_score', models.PositiveSmallIntegerField(default=0)),
+                ('set2_team2_score', models.PositiveSmallIntegerField(default=0)),
+                ('set3_team2_score', models.PositiveSmallIntegerField(default=0)),
+                ('set4_team2_score', models.PositiveSmallIntegerField(blank=True, default=0, null=True)),
+                ('set5_team2_score', models.PositiveSmallIntegerField(blank=True, default=0, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='player',
+            name='photo',
+            field=models.ImageField(blank=True, default=settings.MEDIA_ROOT + '/avatars/user.png', null=True, upload_to=api.models.upload_path_handler),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='owner',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.CASCADE, related_name='teams', to=settings.AUTH_USER_MODEL),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='player',
+            name='position',
+            field=models.CharField(choices=[('L', 'Libero'), ('S', 'Setter'), ('OH', 'Outside hitter'), ('OP', 'Opposite hitter'), ('MB', 'Middle blocker')], max_length=2),
+        ),
+        migrations.AlterUniqueTogether(
+            name='playermembership',
+            unique_together={('player', 'team')},
+        ),
+        migrations.CreateModel(
+            name='PlayerRecords',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('serve', models.PositiveSmallIntegerField(default=0)),
+                ('serve_error', models.PositiveSmallIntegerField(default=0)),
+                ('serve_ace', models.PositiveSmallIntegerField(default=0)),
+                ('reception', models.PositiveSmallIntegerField(default=0)),
+                ('positive_reception', models.PositiveSmallIntegerField(default=0)),
+                ('reception_error', models.PositiveSmallIntegerField(default=0)),
+                ('spike', models.PositiveSmallIntegerField(default=0)),
+                ('spike_point', models.PositiveSmallIntegerField(default=0)),
+                ('block_amount', models.PositiveSmallIntegerField(default=0)),
+                ('dig', models.PositiveSmallIntegerField(default=0)),
+                ('block_amount_match', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='block_amount_matches', to='api.match')),
+                ('dig_match', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='dig_matches', to='api.match')),
+                ('player', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='api.player')),
+                ('positive_reception_match', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='positive_reception_matches', to='api.match')),
+                ('reception_error_match', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reception_error_matches', to='api.match')),
+                ('reception_match', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reception_matches', to='api.match')),
+                ('serve_ace_match', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='serve_ace_matches', to='api.match')),
+                ('serve_error_match', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='serve_error_matches', to='api.match')),
+                ('serve_match', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='serve_matches', to='api.match')),
+                ('spike_match', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='spike_matches', to='api.match')),
+                ('spike_point_match', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='spike_point_matches', to='api.match')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='team1',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='home_matches', to='api.team'),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='team2',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='away_matches', to='api.team'),
+        ),
+        migrations.CreateModel(
+            name='Comment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('description', models.TextField(max_length=512)),
+                ('time', models.DateTimeField(auto_now_add=True)),
+                ('object_id', models.PositiveIntegerField()),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_comments', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserFriendshipInvitation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('invitee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invited_users', to=settings.AUTH_USER_MODEL)),
+                ('inviter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invitations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('inviter', 'invitee')},
+            },
+        ),
+        migrations.CreateModel(
+            name='UserFriendship',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user1', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user1_friendships', to=settings.AUTH_USER_MODEL)),
+                ('user2', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user2_friendships', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user1', 'user2')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TeamInvitation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.team')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'team')},
+            },
+        ),
+        migrations.CreateModel(
+            name='MatchPerformance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('set1_position', models.PositiveSmallIntegerField(blank=True, choices=[(1, 'Position 1'), (2, 'Position 2'), (3, 'Position 3'), (4, 'Position 4'), (5, 'Position 5'), (6, 'Position 6'), (7, 'Libero'), (8, 'Substitution')], null=True)),
+                ('set2_position', models.PositiveSmallIntegerField(blank=True, choices=[(1, 'Position 1'), (2, 'Position 2'), (3, 'Position 3'), (4, 'Position 4'), (5, 'Position 5'), (6, 'Position 6'), (7, 'Libero'), (8, 'Substitution')], null=True)),
+                ('set3_position', models.PositiveSmallIntegerField(blank=True, choices=[(1, 'Position 1'), (2, 'Position 2'), (3, 'Position 3'), (4, 'Position 4'), (5, 'Position 5'), (6, 'Position 6'), (7, 'Libero'), (8, 'Substitution')], null=True)),
+                ('set4_position', models.PositiveSmallIntegerField(blank=True, choices=[(1, 'Position 1'), (2, 'Position 2'), (3, 'Position 3'), (4, 'Position 4'), (5, 'Position 5'), (6, 'Position 6'), (7, 'Libero'), (8, 'Substitution')], null=True)),
+                ('set5_position', models.PositiveSmallIntegerField(blank=True, choices=[(1, 'Position 1'), (2, 'Position 2'), (3, 'Position 3'), (4, 'Position 4'), (5, 'Position 5'), (6, 'Position 6'), (7, 'Libero'), (8, 'Substitution')], null=True)),
+                ('serve', models.PositiveSmallIntegerField(default=0)),
+                ('serve_error', models.PositiveSmallIntegerField(default=0)),
+                ('serve_ace', models.PositiveSmallIntegerField(default=0)),
+                ('reception', models.PositiveSmallIntegerField(default=0)),
+                ('positive_reception', models.PositiveSmallIntegerField(default=0)),
+                ('reception_error', models.PositiveSmallIntegerField(default=0)),
+                ('spike', models.PositiveSmallIntegerField(default=0)),
+                ('spike_point', models.PositiveSmallIntegerField(default=0)),
+                ('spike_block', models.PositiveSmallIntegerField(default=0)),
+                ('spike_error', models.PositiveSmallIntegerField(default=0)),
+                ('block_amount', models.PositiveSmallIntegerField(default=0)),
+                ('dig', models.PositiveSmallIntegerField(default=0)),
+                ('match', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.match')),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.player')),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.team')),
+            ],
+            options={
+                'unique_together': {('player', 'match')},
+            },
+        ),
+    ]
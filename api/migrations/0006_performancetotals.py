@@ -0,0 +1,52 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_sync_models'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerformanceTotals',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('performances', models.IntegerField(default=0)),
+                ('sets_played', models.IntegerField(default=0)),
+                ('serve', models.IntegerField(default=0)),
+                ('serve_error', models.IntegerField(default=0)),
+                ('serve_ace', models.IntegerField(default=0)),
+                ('reception', models.IntegerField(default=0)),
+                ('positive_reception', models.IntegerField(default=0)),
+                ('reception_error', models.IntegerField(default=0)),
+                ('spike', models.IntegerField(default=0)),
+                ('spike_point', models.IntegerField(default=0)),
+                ('spike_block', models.IntegerField(default=0)),
+                ('spike_error', models.IntegerField(default=0)),
+                ('block_amount', models.IntegerField(default=0)),
+                ('dig', models.IntegerField(default=0)),
+                ('player', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='performance_totals', to='api.player')),
+                ('team', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='performance_totals', to='api.team')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='performancetotals',
+            constraint=models.UniqueConstraint(condition=models.Q(('team__isnull', True)), fields=('player',), name='unique_player_totals'),
+        ),
+        migrations.AddConstraint(
+            model_name='performancetotals',
+            constraint=models.UniqueConstraint(condition=models.Q(('player__isnull', True)), fields=('team',), name='unique_team_totals'),
+        ),
+        migrations.AddConstraint(
+            model_name='performancetotals',
+            constraint=models.UniqueConstraint(fields=('player', 'team'), name='unique_player_team_totals'),
+        ),
+        migrations.AddConstraint(
+            model_name='performancetotals',
+            constraint=models.CheckConstraint(check=models.Q(('player__isnull', False), ('team__isnull', False), _connector='OR'), name='totals_player_or_team'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_performancetotals'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['content_type', 'object_id', 'time'], name='comment_object_time_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:14
+
+from django.db import migrations, models
+
+
+def fill_normalized_names(apps, schema_editor):
+    Team = apps.get_model('api', 'Team')
+    teams = []
+    for team in Team.objects.only('name').iterator(chunk_size=2000):
+        team.normalized_name = team.name.strip().casefold()
+        teams.append(team)
+    Team.objects.bulk_update(teams, ['normalized_name'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_player_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='team',
+            name='normalized_name',
+            field=models.CharField(default='', editable=False, max_length=128),
+        ),
+        migrations.RunPython(fill_normalized_names, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='team',
+            index=models.Index(fields=['normalized_name'], name='team_normalized_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='team',
+            index=models.Index(fields=['owner', 'normalized_name'], name='team_owner_name_idx'),
+        ),
+    ]
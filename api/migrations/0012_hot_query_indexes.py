@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_team_normalized_name'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['team1', 'time'], name='match_team1_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['team2', 'time'], name='match_team2_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='matchperformance',
+            index=models.Index(fields=['player', 'team'], name='performance_player_team_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='playermembership',
+            index=models.Index(condition=models.Q(('date_left__isnull', True)), fields=['team', 'player'], name='membership_active_team_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userfriendship',
+            index=models.Index(fields=['user2', 'user1'], name='friendship_user2_user1_idx'),
+        ),
+    ]
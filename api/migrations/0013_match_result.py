@@ -0,0 +1,59 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_results(apps, schema_editor):
+    # historical models have no update_result, this mirrors it
+    Match = apps.get_model('api', 'Match')
+    matches = []
+    for match in Match.objects.iterator(chunk_size=2000):
+        scores = [(getattr(match, f'set{i}_team1_score') or 0, getattr(match, f'set{i}_team2_score') or 0)
+                  for i in range(1, 6)]
+        match.team1_sets = sum(1 for team1, team2 in scores if team1 > team2)
+        match.team2_sets = sum(1 for team1, team2 in scores if team2 > team1)
+        match.total_points = sum(team1 + team2 for team1, team2 in scores)
+        if match.team1_sets >= 3:
+            match.winner_id = match.team1_id
+        elif match.team2_sets >= 3:
+            match.winner_id = match.team2_id
+        else:
+            match.winner_id = None
+        matches.append(match)
+    Match.objects.bulk_update(matches, ['team1_sets', 'team2_sets', 'total_points', 'winner'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='team1_sets',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='team2_sets',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='total_points',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='winner',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='won_matches', to='api.team'),
+        ),
+        migrations.RunPython(fill_results, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['winner', 'time'], name='match_winner_time_idx'),
+        ),
+    ]
@@ -30,6 +30,14 @@ class Player(models.Model):
     position = models.CharField(max_length=2, choices=POSITIONS)
     photo = models.ImageField(upload_to=upload_path_handler, default=settings.MEDIA_ROOT + "/avatars/user.png",
                               null=True, blank=True)
+    # elo rating, maintained by api.services.ratings
+    rating = models.FloatField(default=1500, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['position'], name='player_position_idx'),
+        ]
 
     def __str__(self):
         return self.name + " " + self.surname
@@ -47,15 +55,36 @@ class UserProfile(models.Model):
     player = models.OneToOneField(Player, related_name='player_profile', on_delete=models.CASCADE)
 
 
+def normalize_team_name(name):
+    return name.strip().casefold()
+
+
 class Team(models.Model):
     name = models.CharField(max_length=64)
+    # casefolded name, prefix lookups on it are index range scans
+    normalized_name = models.CharField(max_length=128, default='', editable=False)
     description = models.TextField(max_length=512)
     players = models.ManyToManyField(Player, through="PlayerMembership", through_fields=("team", "player"))
     owner = models.ForeignKey(User, related_name='teams', on_delete=models.CASCADE)
+    rating = models.FloatField(default=1500, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['normalized_name'], name='team_normalized_name_idx'),
+            models.Index(fields=['owner', 'normalized_name'], name='team_owner_name_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_team_name(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'normalized_name'}
+        super().save(*args, **kwargs)
+
 
 class PlayerMembership(models.Model):
     player = models.ForeignKey(Player, on_delete=models.CASCADE)
@@ -65,17 +94,28 @@ class PlayerMembership(models.Model):
 
     class Meta:
         unique_together = (('player', 'team'),)
+        indexes = [
+            # active rosters, only current members are indexed
+            models.Index(fields=['team', 'player'], condition=models.Q(date_left__isnull=True),
+                         name='membership_active_team_idx'),
+        ]
 
 
 class Comment(models.Model):
     user = models.ForeignKey(User, related_name='user_comments', on_delete=models.CASCADE)
     description = models.TextField(max_length=512)
     time = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
     object_id = models.PositiveIntegerField()
     content_object = GenericForeignKey('content_type', 'object_id')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['content_type', 'object_id', 'time'], name='comment_object_time_idx'),
+        ]
+
 
 class Match(models.Model):
     team1 = models.ForeignKey(Team, related_name='home_matches', on_delete=models.CASCADE)
@@ -91,10 +131,59 @@ class Match(models.Model):
     set3_team2_score = models.PositiveSmallIntegerField(default=0)
     set4_team2_score = models.PositiveSmallIntegerField(default=0, null=True, blank=True)
     set5_team2_score = models.PositiveSmallIntegerField(default=0, null=True, blank=True)
+    # derived from the set scores by update_result on every save
+    team1_sets = models.PositiveSmallIntegerField(default=0, editable=False)
+    team2_sets = models.PositiveSmallIntegerField(default=0, editable=False)
+    winner = models.ForeignKey(Team, related_name='won_matches', on_delete=models.SET_NULL, null=True, blank=True,
+                               editable=False, db_index=False)
+    total_points = models.PositiveSmallIntegerField(default=0, editable=False)
+    # team ratings before the match and the change of team1, team2 got the opposite, NULL while not rated
+    team1_rating = models.FloatField(null=True, blank=True, editable=False)
+    team2_rating = models.FloatField(null=True, blank=True, editable=False)
+    rating_change = models.FloatField(null=True, blank=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    RESULT_FIELDS = ('team1_sets', 'team2_sets', 'winner', 'total_points')
+    # best of five
+    SETS_TO_WIN = 3
+
+    class Meta:
+        indexes = [
+            # season leaderboards select matches by time range
+            models.Index(fields=['time'], name='match_time_idx'),
+            # a team's matches in a time window, each side of Q(team1) | Q(team2) gets its own range
+            models.Index(fields=['team1', 'time'], name='match_team1_time_idx'),
+            models.Index(fields=['team2', 'time'], name='match_team2_time_idx'),
+            models.Index(fields=['winner', 'time'], name='match_winner_time_idx'),
+        ]
 
     def __str__(self):
         return str(self.team1) + ' vs ' + str(self.team2)
 
+    def save(self, *args, **kwargs):
+        self.update_result()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *self.RESULT_FIELDS}
+        super().save(*args, **kwargs)
+
+    def set_scores(self):
+        return [(getattr(self, f'set{i}_team1_score') or 0, getattr(self, f'set{i}_team2_score') or 0)
+                for i in range(1, 6)]
+
+    def update_result(self):
+        scores = self.set_scores()
+        self.team1_sets = sum(1 for team1, team2 in scores if team1 > team2)
+        self.team2_sets = sum(1 for team1, team2 in scores if team2 > team1)
+        self.total_points = sum(team1 + team2 for team1, team2 in scores)
+        # no winner until one side has won the match, which covers matches not played yet or entered halfway
+        if self.team1_sets >= self.SETS_TO_WIN:
+            self.winner_id = self.team1_id
+        elif self.team2_sets >= self.SETS_TO_WIN:
+            self.winner_id = self.team2_id
+        else:
+            self.winner_id = None
+
 
 class TeamInvitation(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -134,9 +223,14 @@ class MatchPerformance(models.Model):
     spike_error = models.PositiveSmallIntegerField(default=0)
     block_amount = models.PositiveSmallIntegerField(default=0)
     dig = models.PositiveSmallIntegerField(default=0)
+    rating_change = models.FloatField(null=True, blank=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = (('player', 'match'),)
+        indexes = [
+            models.Index(fields=['player', 'team'], name='performance_player_team_idx'),
+        ]
 
 
 class PlayerRecords(models.Model):
@@ -173,12 +267,48 @@ class PlayerRecords(models.Model):
                                   related_name='dig_matches')
 
 
+class PerformanceTotals(models.Model):
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, null=True, blank=True,
+                               related_name='performance_totals')
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, null=True, blank=True, related_name='performance_totals')
+    performances = models.IntegerField(default=0)
+    sets_played = models.IntegerField(default=0)
+    serve = models.IntegerField(default=0)
+    serve_error = models.IntegerField(default=0)
+    serve_ace = models.IntegerField(default=0)
+    reception = models.IntegerField(default=0)
+    positive_reception = models.IntegerField(default=0)
+    reception_error = models.IntegerField(default=0)
+    spike = models.IntegerField(default=0)
+    spike_point = models.IntegerField(default=0)
+    spike_block = models.IntegerField(default=0)
+    spike_error = models.IntegerField(default=0)
+    block_amount = models.IntegerField(default=0)
+    dig = models.IntegerField(default=0)
+
+    class Meta:
+        # one row per player, per team and per player in team, NULL marks the key that is summed over
+        constraints = [
+            models.UniqueConstraint(fields=['player'], condition=models.Q(team__isnull=True),
+                                    name='unique_player_totals'),
+            models.UniqueConstraint(fields=['team'], condition=models.Q(player__isnull=True),
+                                    name='unique_team_totals'),
+            models.UniqueConstraint(fields=['player', 'team'], name='unique_player_team_totals'),
+            models.CheckConstraint(check=models.Q(player__isnull=False) | models.Q(team__isnull=False),
+                                   name='totals_player_or_team'),
+        ]
+
+
 class UserFriendship(models.Model):
     user1 = models.ForeignKey(User, related_name='user1_friendships', on_delete=models.CASCADE)
     user2 = models.ForeignKey(User, related_name='user2_friendships',  on_delete=models.CASCADE)
 
     class Meta:
         unique_together = (('user1', 'user2'),)
+        indexes = [
+            # friendships are looked up from either side
+            models.Index(fields=['user2', 'user1'], name='friendship_user2_user1_idx'),
+        ]
 
 
 class UserFriendshipInvitation(models.Model):
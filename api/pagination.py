@@ -0,0 +1,129 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+def reverse_ordering(ordering):
+    return tuple(field[1:] if field.startswith('-') else '-' + field for field in ordering)
+
+
+class KeysetPagination(CursorPagination):
+    # lists stay unpaginated unless a cursor or a page size is requested,
+    # a position holds every ordering field, so rows sharing a time are told apart by id and never skipped by offset
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('id',)
+
+    def is_requested(self, request):
+        return self.cursor_query_param in request.query_params or \
+            self.page_size_query_param in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.fields = self.get_fields(queryset, self.ordering)
+        self.cursor = self.decode_cursor(request)
+        reverse, position = (self.cursor.reverse, self.cursor.position) if self.cursor else (False, None)
+
+        ordering = reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(ordering, json.loads(position)))
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        following = self._get_position_from_instance(results[-1], self.ordering) \
+            if len(results) > self.page_size else None
+
+        # the links are built by CursorPagination from these, positions are unique so it never adds an offset
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.next_position = position is not None, position
+            self.has_previous, self.previous_position = following is not None, following
+        else:
+            self.has_next, self.next_position = following is not None, following
+            self.has_previous, self.previous_position = position is not None, position
+        self.display_page_controls = self.has_previous or self.has_next
+        return self.page
+
+    @staticmethod
+    def after(ordering, position):
+        # (a, b) after (x, y) is a after x, or a equal to x and b after y
+        condition, equal = Q(pk__in=[]), {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            condition |= Q(**equal, **{f'{name}__{"lt" if field.startswith("-") else "gt"}': value})
+            equal[name] = value
+        return condition
+
+    def get_ordering(self, request, queryset, view):
+        # pages follow the order the view gave its queryset, the id breaks ties so every position is unique
+        ordering = tuple(queryset.query.order_by)
+        if not ordering or not all(isinstance(field, str) and '__' not in field for field in ordering):
+            ordering = tuple(self.ordering)
+        if ordering[-1].lstrip('-') not in ('id', 'pk'):
+            ordering += ('-id' if ordering[-1].startswith('-') else 'id',)
+        return ordering
+
+    @staticmethod
+    def get_fields(queryset, ordering):
+        # annotated orderings such as match_time are checked against their output field
+        fields = []
+        for field in ordering:
+            name = field.lstrip('-')
+            if name in queryset.query.annotations:
+                fields.append(queryset.query.annotations[name].output_field)
+            else:
+                fields.append(queryset.model._meta.pk if name == 'pk' else queryset.model._meta.get_field(name))
+        return fields
+
+    def decode_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        if cursor is None or cursor.position is None:
+            return cursor
+        try:
+            position = json.loads(cursor.position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # values the filter cannot use would fail in the orm, so they are rejected like any other bad cursor
+        try:
+            for field, value in zip(self.fields, position):
+                field.run_validators(field.to_python(value))
+        except (ValidationError, TypeError, ValueError, OverflowError):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor._replace(offset=0)
+
+    def _get_position_from_instance(self, instance, ordering):
+        return json.dumps([str(getattr(instance, field.lstrip('-'))) for field in ordering])
+
+
+class PlayerPagination(KeysetPagination):
+    ordering = ('id',)
+
+
+class TeamPagination(KeysetPagination):
+    ordering = ('id',)
+
+
+class MatchPagination(KeysetPagination):
+    ordering = ('-time', '-id')
+
+
+class MatchPerformancePagination(KeysetPagination):
+    # match_time is annotated by MatchPerformanceViewset
+    ordering = ('-match_time', '-id')
+
+
+class CommentPagination(KeysetPagination):
+    page_size = 20
+    max_page_size = 100
+    ordering = ('-time', '-id')
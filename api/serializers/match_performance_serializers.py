@@ -1,7 +1,9 @@
+from django.core.exceptions import ValidationError
 from rest_framework import serializers
 
-from api.models import MatchPerformance
+from api.models import MatchPerformance, Player, Match, Team
 from api.serializers.serializers import MatchSerializer, TeamSerializer, PlayerSerializer
+from api.services.performance_sheets import upsert_performances
 
 
 class MatchPerformanceSerializer(serializers.ModelSerializer):
@@ -59,3 +61,61 @@ class MatchPerformanceCreateSerializer(serializers.ModelSerializer):
 
     def validate(self, data):
         return data
+
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    # looks instances up in the ones loaded by MatchPerformanceSheetListSerializer instead of one query per row
+    def to_internal_value(self, data):
+        instances = self.context.get('prefetched', {}).get(self.field_name)
+        if instances is None:
+            return super().to_internal_value(data)
+        try:
+            pk = self.get_queryset().model._meta.pk.to_python(data)
+        except (TypeError, ValueError, ValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in instances:
+            self.fail('does_not_exist', pk_value=data)
+        return instances[pk]
+
+
+class MatchPerformanceSheetListSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.context['prefetched'] = {
+                name: field.get_queryset().in_bulk(self._related_ids(data, name, field))
+                for name, field in self.child.fields.items() if isinstance(field, PrefetchedPrimaryKeyRelatedField)
+            }
+        return super().to_internal_value(data)
+
+    @staticmethod
+    def _related_ids(data, name, field):
+        ids = set()
+        for item in data:
+            try:
+                ids.add(field.get_queryset().model._meta.pk.to_python(item.get(name)))
+            except (AttributeError, TypeError, ValueError, ValidationError):
+                continue
+        ids.discard(None)
+        return ids
+
+    def validate(self, attrs):
+        keys = [(item['player'].id, item['match'].id) for item in attrs]
+        if len(keys) != len(set(keys)):
+            raise serializers.ValidationError('Each player can have only one performance per match')
+        return attrs
+
+    def create(self, validated_data):
+        return upsert_performances(validated_data)
+
+
+class MatchPerformanceSheetSerializer(serializers.ModelSerializer):
+    player = PrefetchedPrimaryKeyRelatedField(queryset=Player.objects.all())
+    match = PrefetchedPrimaryKeyRelatedField(queryset=Match.objects.all())
+    team = PrefetchedPrimaryKeyRelatedField(queryset=Team.objects.all())
+
+    class Meta:
+        model = MatchPerformance
+        fields = '__all__'
+        # existing (player, match) rows are replaced by the upsert
+        validators = []
+        list_serializer_class = MatchPerformanceSheetListSerializer
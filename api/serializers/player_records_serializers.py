@@ -1,7 +1,26 @@
 from rest_framework import serializers
 
-from api.models import PlayerRecords
+from api.models import PlayerRecords, Match
 from api.serializers.serializers import MatchSerializer
+from api.services.player_records import RECORD_FIELDS
+
+
+def serialize_record_matches(records):
+    match_ids = {getattr(record, f'{field}_match_id') for record in records for field in RECORD_FIELDS}
+    match_ids.discard(None)
+    matches = Match.objects.select_related('team1', 'team2').in_bulk(match_ids)
+    return {match_id: MatchSerializer(match).data for match_id, match in matches.items()}
+
+
+class PlayerRecordsListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        records = list(data.all() if hasattr(data, 'all') else data)
+        # matches of all records are loaded at once instead of ten lazy loads per record
+        self.child.loaded_matches = serialize_record_matches(records)
+        try:
+            return super().to_representation(records)
+        finally:
+            self.child.loaded_matches = None
 
 
 class PlayerRecordsSerializer(serializers.ModelSerializer):
@@ -15,68 +34,53 @@ class PlayerRecordsSerializer(serializers.ModelSerializer):
     spike_point = serializers.SerializerMethodField()
     block_amount = serializers.SerializerMethodField()
     dig = serializers.SerializerMethodField()
+    loaded_matches = None
 
-    def get_serve(self, obj):
+    def to_representation(self, instance):
+        # a record serialized on its own loads its matches, one from a list uses the ones its list loaded
+        self.record_matches = self.loaded_matches
+        if self.record_matches is None:
+            self.record_matches = serialize_record_matches([instance])
+        return super().to_representation(instance)
+
+    def get_record(self, obj, field):
         return {
-            'amount': obj.serve,
-            'match': MatchSerializer(obj.serve_match).data if obj.serve_match is not None else None
+            'amount': getattr(obj, field),
+            'match': self.record_matches.get(getattr(obj, f'{field}_match_id'))
         }
 
+    def get_serve(self, obj):
+        return self.get_record(obj, 'serve')
+
     def get_serve_error(self, obj):
-        return {
-            'amount': obj.serve_error,
-            'match': MatchSerializer(obj.serve_error_match).data if obj.serve_error_match is not None else None
-        }
+        return self.get_record(obj, 'serve_error')
 
     def get_serve_ace(self, obj):
-        return {
-            'amount': obj.serve_ace,
-            'match': MatchSerializer(obj.serve_ace_match).data if obj.serve_ace_match is not None else None
-        }
+        return self.get_record(obj, 'serve_ace')
 
     def get_reception(self, obj):
-        return {
-            'amount': obj.reception,
-            'match': MatchSerializer(obj.reception_match).data if obj.reception_match is not None else None
-        }
+        return self.get_record(obj, 'reception')
 
     def get_positive_reception(self, obj):
-        return {
-            'amount': obj.positive_reception,
-            'match': MatchSerializer(obj.positive_reception_match).data if obj.positive_reception_match is not None else None
-        }
+        return self.get_record(obj, 'positive_reception')
 
     def get_reception_error(self, obj):
-        return {
-            'amount': obj.reception_error,
-            'match': MatchSerializer(obj.reception_error_match).data if obj.reception_error_match is not None else None
-        }
+        return self.get_record(obj, 'reception_error')
 
     def get_spike(self, obj):
-        return {
-            'amount': obj.spike,
-            'match': MatchSerializer(obj.spike_match).data if obj.spike_match is not None else None
-        }
+        return self.get_record(obj, 'spike')
 
     def get_spike_point(self, obj):
-        return {
-            'amount': obj.spike_point,
-            'match': MatchSerializer(obj.spike_point_match).data if obj.spike_point_match is not None else None
-        }
+        return self.get_record(obj, 'spike_point')
 
     def get_block_amount(self, obj):
-        return {
-            'amount': obj.block_amount,
-            'match': MatchSerializer(obj.block_amount_match).data if obj.block_amount_match is not None else None
-        }
+        return self.get_record(obj, 'block_amount')
 
     def get_dig(self, obj):
-        return {
-            'amount': obj.dig,
-            'match': MatchSerializer(obj.dig_match).data if obj.dig_match is not None else None
-        }
+        return self.get_record(obj, 'dig')
 
     class Meta:
         model = PlayerRecords
         fields = ('serve', 'serve_error', 'serve_ace', 'reception', 'positive_reception', 'reception_error',
                   'spike', 'spike_point', 'block_amount', 'dig')
+        list_serializer_class = PlayerRecordsListSerializer
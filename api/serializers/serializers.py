@@ -1,3 +1,4 @@
+from django.contrib.contenttypes.models import ContentType
 from django.db.models import Q
 from rest_framework import serializers
 from django.contrib.auth.models import User
@@ -6,6 +7,11 @@ from api.models import Player, Team, PlayerMembership, UserProfile, Comment, Mat
     UserFriendshipInvitation
 
 
+def count_comments(obj):
+    # comments themselves are served paginated by CommentViewset
+    return Comment.objects.filter(content_type=ContentType.objects.get_for_model(obj), object_id=obj.id).count()
+
+
 class PlayerSerializer(serializers.ModelSerializer):
     photo_url = serializers.SerializerMethodField()
 
@@ -25,14 +31,14 @@ class PlayerSerializer(serializers.ModelSerializer):
 
 class PlayerFullSerializer(serializers.ModelSerializer):
     photo_url = serializers.SerializerMethodField()
-    comments = serializers.SerializerMethodField()
+    comments_count = serializers.SerializerMethodField()
     user = serializers.SerializerMethodField()
     friends = serializers.SerializerMethodField()
 
     class Meta:
         model = Player
         fields = ('id', 'name', 'surname', 'nick', 'year_of_birth', 'height', 'weight', 'position', 'photo_url'
-                  , 'comments', 'user', 'friends')
+                  , 'rating', 'comments_count', 'user', 'friends')
 
     def get_photo_url(self, obj):
         try:
@@ -40,10 +46,8 @@ class PlayerFullSerializer(serializers.ModelSerializer):
         except KeyError:
             return None
 
-    def get_comments(self, obj):
-        comments = Comment.objects.filter(object_id=obj.id, content_type=9)
-        serializer = CommentSerializer(comments, many=True)
-        return serializer.data
+    def get_comments_count(self, obj):
+        return count_comments(obj)
 
     def get_user(self, obj):
         try:
@@ -101,7 +105,7 @@ class ChangePasswordSerializer(serializers.Serializer):
 class TeamSerializer(serializers.ModelSerializer):
     class Meta:
         model = Team
-        fields = ('id', 'name', 'description', 'owner')
+        fields = ('id', 'name', 'description', 'rating', 'owner')
 
 
 class MemberSerializer(serializers.ModelSerializer):
@@ -119,7 +123,7 @@ class CommentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Comment
-        fields = ('id', 'user', 'description')
+        fields = ('id', 'user', 'description', 'time')
 
     def get_commented_object(self, obj):
         if obj.content_type.model == 'team':
@@ -128,54 +132,35 @@ class CommentSerializer(serializers.ModelSerializer):
         return serializer.data
 
     def get_user(self, obj):
-        user = User.objects.get(pk=obj.user.id)
-        serialized_user = UserSerializer(user, many=False)
+        serialized_user = UserSerializer(obj.user, many=False)
         return serialized_user.data
 
 
 class TeamFullSerializer(serializers.ModelSerializer):
     players = serializers.SerializerMethodField('get_active_players')
-    comments = serializers.SerializerMethodField()
+    comments_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Team
-        fields = ('id', 'name', 'description', 'players', 'comments', 'owner')
+        fields = ('id', 'name', 'description', 'players', 'comments_count', 'owner')
 
     def get_active_players(self, obj):
-        players = obj.players.all()
-        active_players = []
-        for player in players:
-            player_serialized = PlayerSerializer(player, many=False)
-            membership = PlayerMembership.objects.get(player=player_serialized.data.get('id'), team=obj.id)
-            membership_serialized = MemberSerializer(membership, many=False)
-            date_left = membership_serialized.data.get('date_left')
-            if date_left is None:
-                active_players.append(player_serialized.data)
-
-        return active_players
-
-    def get_comments(self, obj):
-        comments = Comment.objects.filter(object_id=obj.id, content_type=11)
-        serializer = CommentSerializer(comments, many=True)
-        return serializer.data
+        players = Player.objects.filter(playermembership__team=obj, playermembership__date_left__isnull=True)
+        return PlayerSerializer(players, many=True).data
+
+    def get_comments_count(self, obj):
+        return count_comments(obj)
 
 
 class TeamPlayerSerializer(serializers.ModelSerializer):
-    date_joined = serializers.SerializerMethodField()
-    date_left = serializers.SerializerMethodField()
+    # annotated from the player's membership by TeamViewset.list
+    date_joined = serializers.DateField(read_only=True)
+    date_left = serializers.DateField(read_only=True)
 
     class Meta:
         model = Team
         fields = ('id', 'name', 'description', 'date_joined', 'date_left')
 
-    def get_date_joined(self, obj):
-        player_membership = PlayerMembership.objects.get(player=self.context['player_id'], team=obj.id)
-        return player_membership.date_joined
-
-    def get_date_left(self, obj):
-        player_membership = PlayerMembership.objects.get(player=self.context['player_id'], team=obj.id)
-        return player_membership.date_left
-
 
 class MatchSerializer(serializers.ModelSerializer):
     team1_name = serializers.SerializerMethodField()
@@ -185,7 +170,8 @@ class MatchSerializer(serializers.ModelSerializer):
         model = Match
         fields = ('id', 'team1', 'team2', 'team1_name', 'team2_name', 'time', 'set1_team1_score', 'set2_team1_score',
                   'set3_team1_score', 'set4_team1_score', 'set5_team1_score', 'set1_team2_score', 'set2_team2_score',
-                  'set3_team2_score', 'set4_team2_score', 'set5_team2_score')
+                  'set3_team2_score', 'set4_team2_score', 'set5_team2_score', 'team1_sets', 'team2_sets', 'winner',
+                  'total_points')
 
     def get_team1_name(self, obj):
         name = obj.team1.name
@@ -201,13 +187,14 @@ class MatchFullSerializer(serializers.ModelSerializer):
     team2 = TeamSerializer(many=False)
     team1_name = serializers.SerializerMethodField()
     team2_name = serializers.SerializerMethodField()
-    comments = serializers.SerializerMethodField()
+    comments_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Match
         fields = ('id', 'team1', 'team2', 'team1_name', 'team2_name', 'time', 'set1_team1_score', 'set2_team1_score',
                   'set3_team1_score', 'set4_team1_score', 'set5_team1_score', 'set1_team2_score', 'set2_team2_score',
-                  'set3_team2_score', 'set4_team2_score', 'set5_team2_score', 'comments')
+                  'set3_team2_score', 'set4_team2_score', 'set5_team2_score', 'team1_sets', 'team2_sets', 'winner',
+                  'total_points', 'comments_count')
 
     def get_team1_name(self, obj):
         name = obj.team1.name
@@ -217,10 +204,8 @@ class MatchFullSerializer(serializers.ModelSerializer):
         name = obj.team2.name
         return name
 
-    def get_comments(self, obj):
-        comments = Comment.objects.filter(object_id=obj.id, content_type=14)
-        serializer = CommentSerializer(comments, many=True)
-        return serializer.data
+    def get_comments_count(self, obj):
+        return count_comments(obj)
 
 
 class TeamInvitationSerializer(serializers.ModelSerializer):
@@ -0,0 +1,29 @@
+from django.db import connection
+
+from api.models import Match, PlayerMembership
+
+
+def nearest_matches(player_ids, moment, past=False):
+    # maps each player to the closest match before (past) or after the moment of any team they are still in
+    player_ids = list(player_ids)
+    if not player_ids:
+        return {}
+    quote_name = connection.ops.quote_name
+    direction = 'DESC' if past else 'ASC'
+    sql = f'''
+        SELECT player_id, match_id FROM (
+            SELECT membership.player_id AS player_id, game.id AS match_id,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY membership.player_id ORDER BY game.time {direction}, game.id {direction}
+                   ) AS match_rank
+            FROM {quote_name(PlayerMembership._meta.db_table)} membership
+            INNER JOIN {quote_name(Match._meta.db_table)} game
+                ON game.team1_id = membership.team_id OR game.team2_id = membership.team_id
+            WHERE membership.player_id IN ({', '.join(['%s'] * len(player_ids))})
+                AND membership.date_left IS NULL
+                AND game.time {'<=' if past else '>='} %s
+        ) ranked
+        WHERE match_rank = 1'''
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*player_ids, connection.ops.adapt_datetimefield_value(moment)])
+        return dict(cursor.fetchall())
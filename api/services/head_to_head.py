@@ -0,0 +1,52 @@
+from django.db.models import Q
+from django.utils import timezone
+
+from api.models import Match, MatchPerformance
+from api.services.performance_stats import STAT_FIELDS, aggregate_performances_by
+
+
+def empty_totals():
+    return dict.fromkeys(STAT_FIELDS + ('performances', 'sets'), 0)
+
+
+def summarize(matches, winner_side, totals):
+    # winner_side maps a finished match to 'side_a' or 'side_b', anything else counts as unfinished
+    result = {side: {'wins': 0, 'losses': 0, 'totals': totals[side]} for side in ('side_a', 'side_b')}
+    unfinished = 0
+    for match in matches:
+        side = winner_side(match)
+        if side is None:
+            unfinished += 1
+            continue
+        result[side]['wins'] += 1
+        result['side_b' if side == 'side_a' else 'side_a']['losses'] += 1
+    now = timezone.now()
+    return dict(result, unfinished=unfinished, matches=matches, finished=all(match.time <= now for match in matches))
+
+
+def team_head_to_head(team_a, team_b):
+    matches = list(Match.objects.select_related('team1', 'team2').filter(
+        Q(team1=team_a, team2=team_b) | Q(team1=team_b, team2=team_a)).order_by('-time', '-id'))
+    totals = aggregate_performances_by(
+        MatchPerformance.objects.filter(match__in=[match.id for match in matches], team__in=(team_a, team_b)), 'team')
+    sides = {team_a: 'side_a', team_b: 'side_b'}
+    return summarize(matches, lambda match: sides.get(match.winner_id), {
+        'side_a': totals.get(team_a) or empty_totals(), 'side_b': totals.get(team_b) or empty_totals()})
+
+
+def player_head_to_head(player_a, player_b):
+    # matches both players played on opposite sides, found through the (player, match) index of performances,
+    # the teams come from their performances
+    shared = MatchPerformance.objects.filter(
+        player=player_a, match__in=MatchPerformance.objects.filter(player=player_b).values('match')).values('match')
+    teams = {}
+    for match_id, player_id, team_id in MatchPerformance.objects.filter(
+            player__in=(player_a, player_b), match__in=shared).values_list('match', 'player', 'team'):
+        teams.setdefault(match_id, {})[player_id] = team_id
+    sides = {match_id: {by_player[player_a]: 'side_a', by_player[player_b]: 'side_b'}
+             for match_id, by_player in teams.items() if by_player[player_a] != by_player[player_b]}
+    matches = list(Match.objects.select_related('team1', 'team2').filter(pk__in=sides).order_by('-time', '-id'))
+    totals = aggregate_performances_by(
+        MatchPerformance.objects.filter(match__in=list(sides), player__in=(player_a, player_b)), 'player')
+    return summarize(matches, lambda match: sides[match.id].get(match.winner_id), {
+        'side_a': totals.get(player_a) or empty_totals(), 'side_b': totals.get(player_b) or empty_totals()})
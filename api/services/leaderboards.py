@@ -0,0 +1,120 @@
+from datetime import MAXYEAR, MINYEAR, datetime
+
+from django.db.models import Count, F, FloatField, Q, Sum, Value
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+
+from api.models import MatchPerformance, PerformanceTotals
+from api.services.performance_stats import SET_POSITION_FIELDS, STAT_FIELDS
+
+PERS = ('set', 'match', 'total')
+SCOPES = ('all', 'season', 'team', 'position')
+SEASON_START_MONTH = 8
+
+# derived counting stats are ranked per set, per match or in total like the counted ones
+SUMMED_STATS = {
+    'total_score': ('serve_ace', 'spike_point', 'block_amount'),
+}
+BALANCE_STATS = {
+    'total_score_balance': (('serve_ace', 'spike_point', 'block_amount'),
+                            ('serve_error', 'reception_error', 'spike_error', 'spike_block')),
+}
+# percentages ignore per, their denominator is the attempts volume checked by min_attempts
+PERCENTAGE_STATS = {
+    'positive_reception_percentage': (('positive_reception',), (), 'reception'),
+    'spike_kill_percentage': (('spike_point',), (), 'spike'),
+    'spike_efficiency': (('spike_point',), ('spike_error', 'spike_block'), 'spike'),
+}
+STATS = STAT_FIELDS + tuple(SUMMED_STATS) + tuple(BALANCE_STATS) + tuple(PERCENTAGE_STATS)
+
+
+class LeaderboardError(ValueError):
+    pass
+
+
+def season_range(season):
+    # the season ends in the following year, which has to exist too
+    if not MINYEAR <= season < MAXYEAR:
+        raise LeaderboardError(f'Season must be between {MINYEAR} and {MAXYEAR - 1}')
+    start = datetime(season, SEASON_START_MONTH, 1, tzinfo=timezone.get_current_timezone())
+    return start, start.replace(year=season + 1)
+
+
+def current_season(moment=None):
+    moment = timezone.localtime(moment)
+    return moment.year if moment.month >= SEASON_START_MONTH else moment.year - 1
+
+
+def total(field):
+    return F(f'total_{field}')
+
+
+def balance(positive, negative):
+    expression = sum((total(field) for field in positive[1:]), total(positive[0]))
+    for field in negative:
+        expression = expression - total(field)
+    return expression
+
+
+def totals_queryset(team_id=None, position=None):
+    queryset = PerformanceTotals.objects.filter(player__isnull=False, team_id=team_id)
+    if position is not None:
+        queryset = queryset.filter(player__position=position)
+    aliases = {f'total_{field}': F(field) for field in STAT_FIELDS}
+    return queryset.annotate(total_performances=F('performances'), total_sets=F('sets_played'), **aliases)
+
+
+def season_queryset(season, team_id=None, position=None):
+    # one grouped statement over the season's matches, found through the match time index
+    start, end = season_range(season)
+    queryset = MatchPerformance.objects.filter(match__time__gte=start, match__time__lt=end)
+    if team_id is not None:
+        queryset = queryset.filter(team=team_id)
+    if position is not None:
+        queryset = queryset.filter(player__position=position)
+    sets = [Count(field) for field in SET_POSITION_FIELDS]
+    aggregates = {f'total_{field}': Coalesce(Sum(field), Value(0)) for field in STAT_FIELDS}
+    return queryset.order_by().values('player').annotate(
+        total_performances=Count('id'), total_sets=sum(sets[1:], sets[0]), **aggregates)
+
+
+def rank_players(stat, per='total', scope='all', season=None, team_id=None, position=None, limit=10, min_sets=0,
+                 min_matches=0, min_attempts=0):
+    if stat not in STATS:
+        raise LeaderboardError(f'Unknown stat {stat}')
+    if per not in PERS:
+        raise LeaderboardError(f'Unknown per {per}')
+    if scope not in SCOPES:
+        raise LeaderboardError(f'Unknown scope {scope}')
+    if scope == 'team' and team_id is None:
+        raise LeaderboardError('Team scope needs a team')
+    if scope == 'position' and position is None:
+        raise LeaderboardError('Position scope needs a position')
+
+    if scope == 'season':
+        queryset = season_queryset(current_season() if season is None else season, team_id, position)
+    else:
+        queryset = totals_queryset(team_id, position)
+
+    conditions = Q(total_performances__gte=max(min_matches, 1), total_sets__gte=min_sets)
+    if stat in PERCENTAGE_STATS:
+        positive, negative, attempts = PERCENTAGE_STATS[stat]
+        conditions &= Q(**{f'total_{attempts}__gte': max(min_attempts, 1)})
+        value = Cast(balance(positive, negative), FloatField()) * 100 / total(attempts)
+    else:
+        if stat in SUMMED_STATS:
+            value = balance(SUMMED_STATS[stat], ())
+        elif stat in BALANCE_STATS:
+            value = balance(*BALANCE_STATS[stat])
+        else:
+            value = total(stat)
+        if per == 'set':
+            conditions &= Q(total_sets__gte=1)
+            value = Cast(value, FloatField()) / F('total_sets')
+        elif per == 'match':
+            value = Cast(value, FloatField()) / F('total_performances')
+
+    rows = queryset.filter(conditions).annotate(value=value).order_by('-value', 'player').values_list(
+        'player', 'value', 'total_performances', 'total_sets')[:limit]
+    return [{'player': player_id, 'value': round(value, 2), 'matches': matches, 'sets': sets}
+            for player_id, value, matches, sets in rows]
@@ -0,0 +1,34 @@
+from django.db import transaction
+
+from api.models import MatchPerformance
+from api.services.performance_stats import SET_POSITION_FIELDS, STAT_FIELDS
+from api.services.performance_totals import apply_performance_changes
+from api.services.player_records import recompute_player_records
+from api.services.ratings import rate_performances, unrate_performances
+
+UPSERT_FIELDS = ('team', 'updated_at') + SET_POSITION_FIELDS + STAT_FIELDS
+
+
+def upsert_performances(rows, batch_size=500):
+    # rows are validated performance data, at most one per (player, match)
+    performances = [MatchPerformance(**row) for row in rows]
+    if not performances:
+        return performances
+    keys = {(performance.player_id, performance.match_id) for performance in performances}
+    player_ids = {player_id for player_id, match_id in keys}
+    match_ids = {match_id for player_id, match_id in keys}
+
+    with transaction.atomic():
+        existing = [
+            performance for performance in MatchPerformance.objects.select_for_update().filter(
+                player_id__in=player_ids, match_id__in=match_ids)
+            if (performance.player_id, performance.match_id) in keys
+        ]
+        MatchPerformance.objects.bulk_create(performances, batch_size=batch_size, update_conflicts=True,
+                                             unique_fields=('player', 'match'), update_fields=UPSERT_FIELDS)
+        apply_performance_changes(removed=existing, added=performances)
+        recompute_player_records({performance.player_id for performance in performances})
+        # replaced sheets give their rating back before the new ones are rated
+        unrate_performances(existing)
+        rate_performances(MatchPerformance.objects.filter(player_id__in=player_ids, match_id__in=match_ids))
+    return performances
@@ -0,0 +1,75 @@
+from django.db.models import Count, Sum, Value
+from django.db.models.functions import Coalesce
+
+STAT_FIELDS = ('serve', 'serve_error', 'serve_ace', 'reception', 'positive_reception', 'reception_error', 'spike',
+               'spike_point', 'spike_block', 'spike_error', 'block_amount', 'dig')
+SET_POSITION_FIELDS = ('set1_position', 'set2_position', 'set3_position', 'set4_position', 'set5_position')
+
+EMPTY_RESULTS = {
+    'total_score': 0,
+    'total_score_balance': 0,
+    'serve': 0,
+    'serve_error': 0,
+    'serve_ace': 0,
+    'reception': 0,
+    'positive_reception': 0,
+    'reception_error': 0,
+    'positive_reception_percentage': 0,
+    'spike': 0,
+    'spike_point': 0,
+    'spike_block': 0,
+    'spike_error': 0,
+    'spike_kill_percentage': 0,
+    'spike_efficiency': 0,
+    'block_amount': 0,
+    'dig': 0,
+}
+
+
+def performance_aggregates():
+    aggregates = {field: Coalesce(Sum(field), Value(0)) for field in STAT_FIELDS}
+    sets = [Count(field) for field in SET_POSITION_FIELDS]
+    return dict(aggregates, performances=Count('id'), sets=sum(sets[1:], sets[0]))
+
+
+def aggregate_performances(queryset):
+    # one statement for all sums and the set count, sliced querysets are aggregated as a subquery
+    return queryset.aggregate(**performance_aggregates())
+
+
+def aggregate_performances_by(queryset, field):
+    # same totals as aggregate_performances for every value of field, in one grouped statement
+    aggregates = {f'total_{name}': aggregate for name, aggregate in performance_aggregates().items()}
+    rows = queryset.order_by().values(field).annotate(**aggregates)
+    return {row.pop(field): {name[len('total_'):]: value for name, value in row.items()} for row in rows}
+
+
+def calculate_avg(totals, divider):
+    if not divider:
+        return dict(EMPTY_RESULTS)
+
+    total_score = totals['spike_point'] + totals['serve_ace'] + totals['block_amount']
+    total_score_balance = total_score - totals['serve_error'] - totals['reception_error'] - totals['spike_error'] - \
+        totals['spike_block']
+    if totals['reception']:
+        positive_reception_percentage = round((totals['positive_reception'] / totals['reception']) * 100)
+    else:
+        positive_reception_percentage = 0
+    if totals['spike']:
+        spike_kill_percentage = round((totals['spike_point'] / totals['spike']) * 100)
+        spike_efficiency = round(((totals['spike_point'] - totals['spike_error'] - totals['spike_block']) /
+                                  totals['spike']) * 100)
+    else:
+        spike_kill_percentage = 0
+        spike_efficiency = 0
+
+    results = {
+        'total_score': round(total_score / divider, 2),
+        'total_score_balance': round(total_score_balance / divider, 2),
+        'positive_reception_percentage': positive_reception_percentage,
+        'spike_kill_percentage': spike_kill_percentage,
+        'spike_efficiency': spike_efficiency,
+    }
+    for field in STAT_FIELDS:
+        results[field] = round(totals[field] / divider, 2)
+    return {key: results[key] for key in EMPTY_RESULTS}
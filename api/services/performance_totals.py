@@ -0,0 +1,109 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from api.models import MatchPerformance, PerformanceTotals
+from api.services.performance_stats import SET_POSITION_FIELDS, STAT_FIELDS
+from api.services.stats_cache import invalidate_all_stats, invalidate_stats
+
+TOTAL_FIELDS = ('performances', 'sets_played') + STAT_FIELDS
+
+
+def totals_keys(player_id, team_id):
+    return (player_id, None), (None, team_id), (player_id, team_id)
+
+
+def performance_values(performance):
+    values = {field: getattr(performance, field) for field in STAT_FIELDS}
+    values['performances'] = 1
+    values['sets_played'] = sum(1 for field in SET_POSITION_FIELDS if getattr(performance, field))
+    return values
+
+
+def apply_performance_changes(removed=(), added=()):
+    # removed performances carry the values they had before the write, added ones the values after it
+    # every performance write goes through here, so it also drops the cached stats of the players and teams involved
+    written = [*removed, *added]
+    invalidate_stats(player_ids=[performance.player_id for performance in written],
+                     team_ids=[performance.team_id for performance in written])
+    deltas = defaultdict(Counter)
+    for sign, performances in ((-1, removed), (1, added)):
+        for performance in performances:
+            values = performance_values(performance)
+            for key in totals_keys(performance.player_id, performance.team_id):
+                for field, value in values.items():
+                    deltas[key][field] += sign * value
+
+    keys = [key for key, delta in deltas.items() if any(delta.values())]
+    if not keys:
+        return
+    player_ids = {player_id for player_id, team_id in keys if player_id is not None}
+    team_ids = {team_id for player_id, team_id in keys if team_id is not None}
+
+    with transaction.atomic():
+        # missing rows are created empty first, so concurrent writers lock the same rows below
+        PerformanceTotals.objects.bulk_create(
+            [PerformanceTotals(player_id=player_id, team_id=team_id) for player_id, team_id in keys],
+            ignore_conflicts=True)
+        rows = PerformanceTotals.objects.select_for_update().filter(
+            Q(player_id__in=player_ids, team__isnull=True) | Q(player__isnull=True, team_id__in=team_ids) |
+            Q(player_id__in=player_ids, team_id__in=team_ids))
+        changed = []
+        for row in rows:
+            delta = deltas.get((row.player_id, row.team_id))
+            if delta:
+                for field, value in delta.items():
+                    setattr(row, field, getattr(row, field) + value)
+                changed.append(row)
+        PerformanceTotals.objects.bulk_update(changed, TOTAL_FIELDS)
+
+
+def get_totals(player_id=None, team_id=None):
+    totals = PerformanceTotals.objects.filter(player_id=player_id, team_id=team_id).values(*TOTAL_FIELDS).first()
+    if totals is None:
+        totals = dict.fromkeys(TOTAL_FIELDS, 0)
+    # same shape as aggregate_performances
+    totals['sets'] = totals.pop('sets_played')
+    return totals
+
+
+def compute_totals():
+    sets = [Count(field) for field in SET_POSITION_FIELDS]
+    aggregates = {field: Sum(field) for field in STAT_FIELDS}
+    aggregates['performances'] = Count('id')
+    aggregates['sets_played'] = sum(sets[1:], sets[0])
+
+    totals = {}
+    for group_by in (('player',), ('team',), ('player', 'team')):
+        for row in MatchPerformance.objects.order_by().values(*group_by).annotate(**aggregates):
+            key = (row.pop('player', None), row.pop('team', None))
+            totals[key] = row
+    return totals
+
+
+def rebuild_totals(batch_size=1000):
+    totals = compute_totals()
+    with transaction.atomic():
+        PerformanceTotals.objects.all().delete()
+        PerformanceTotals.objects.bulk_create(
+            [PerformanceTotals(player_id=player_id, team_id=team_id, **values)
+             for (player_id, team_id), values in totals.items()],
+            batch_size=batch_size)
+    invalidate_all_stats()
+    return len(totals)
+
+
+def find_totals_mismatches():
+    expected = compute_totals()
+    mismatches = []
+    for row in PerformanceTotals.objects.values('player', 'team', *TOTAL_FIELDS):
+        key = (row.pop('player'), row.pop('team'))
+        values = expected.pop(key, None)
+        if values is None:
+            if any(row.values()):
+                mismatches.append((key, row, None))
+        elif values != row:
+            mismatches.append((key, row, values))
+    mismatches.extend((key, None, values) for key, values in expected.items())
+    return mismatches
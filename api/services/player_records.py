@@ -0,0 +1,68 @@
+from django.db import transaction
+from django.db.models import F, Max, Window
+from django.db.models.functions import FirstValue, RowNumber
+
+from api.models import MatchPerformance, PlayerRecords
+from api.services.stats_cache import invalidate_all_stats
+
+RECORD_FIELDS = ('serve', 'serve_error', 'serve_ace', 'reception', 'positive_reception', 'reception_error', 'spike',
+                 'spike_point', 'block_amount', 'dig')
+RECORD_MATCH_FIELDS = tuple(f'{field}_match' for field in RECORD_FIELDS)
+
+
+def compute_player_records(player_ids=None):
+    # one set based pass, windows over each player's performances give the maximum of every stat and the first match,
+    # in the order matches were played, in which it was reached, and one row per player is kept
+    player = [F('player')]
+    windows = {'row': Window(RowNumber(), partition_by=player, order_by=F('id').asc())}
+    for field in RECORD_FIELDS:
+        windows[f'{field}_maximum'] = Window(Max(field), partition_by=player)
+        windows[f'{field}_first_match'] = Window(FirstValue('match'), partition_by=player, order_by=[
+            F(field).desc(), F('match__time').asc(), F('match').asc()])
+    queryset = MatchPerformance.objects.order_by().annotate(**windows).filter(row=1).values_list(
+        'player', *(f'{field}_maximum' for field in RECORD_FIELDS),
+        *(f'{field}_first_match' for field in RECORD_FIELDS))
+    if player_ids is not None:
+        queryset = queryset.filter(player__in=player_ids)
+
+    records = {}
+    for player_id, *values in queryset:
+        maximums, matches = values[:len(RECORD_FIELDS)], values[len(RECORD_FIELDS):]
+        # a stat never above zero has no record match
+        records[player_id] = (maximums, [match if maximum else None for maximum, match in zip(maximums, matches)])
+    return records
+
+
+def recompute_player_records(player_ids=None, batch_size=1000):
+    # player_ids limits the work to the players touched by a write, None rebuilds every record
+    if player_ids is not None:
+        player_ids = set(player_ids)
+        if not player_ids:
+            return
+    computed = compute_player_records(player_ids)
+
+    with transaction.atomic():
+        queryset = PlayerRecords.objects.select_for_update()
+        if player_ids is not None:
+            queryset = queryset.filter(player__in=player_ids)
+        existing = {record.player_id: record for record in queryset}
+
+        created, updated = [], []
+        for player_id, (maximums, matches) in computed.items():
+            record = existing.pop(player_id, None)
+            if record is None:
+                record = PlayerRecords(player_id=player_id)
+                created.append(record)
+            else:
+                updated.append(record)
+            for field, maximum, match_id in zip(RECORD_FIELDS, maximums, matches):
+                setattr(record, field, maximum)
+                setattr(record, f'{field}_match_id', match_id)
+
+        # players left without performances have no records
+        if existing:
+            PlayerRecords.objects.filter(id__in=[record.id for record in existing.values()]).delete()
+        PlayerRecords.objects.bulk_create(created, batch_size=batch_size)
+        PlayerRecords.objects.bulk_update(updated, RECORD_FIELDS + RECORD_MATCH_FIELDS, batch_size=batch_size)
+    if player_ids is None:
+        invalidate_all_stats()
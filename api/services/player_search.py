@@ -0,0 +1,90 @@
+import math
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from api.models import Player
+from api.services.search_index import SEARCH_TABLE, VOCAB_TABLE
+
+TRIGRAM = 3
+
+
+class DatabaseSearchBackend:
+    # portable fallback, every word has to appear in the name, surname or nick
+    def search(self, query, limit):
+        condition = Q()
+        for word in query.split():
+            condition &= Q(name__icontains=word) | Q(surname__icontains=word) | Q(nick__icontains=word)
+        queryset = Player.objects.filter(condition).order_by('surname', 'name', 'id')
+        return list(queryset.values_list('id', flat=True)[:limit])
+
+
+class SqliteSearchBackend:
+    # fts5 trigram index, exact substrings rank first and shared trigrams fill the rest for misspelt queries
+    fallback = DatabaseSearchBackend
+    # misspelt matches have to share this part of the query trigrams, among this many candidates per result
+    similarity = 0.5
+    candidates = 20
+
+    def search(self, query, limit):
+        words = [word for word in query.lower().split() if len(word) >= TRIGRAM]
+        if not words:
+            return self.fallback().search(query, limit)
+
+        ids = [row[0] for row in self.match(' AND '.join(self.phrase(word) for word in words), limit)]
+        if len(ids) < limit:
+            ids += self.similar(words, limit - len(ids), exclude=ids)
+        return ids
+
+    def similar(self, words, limit, exclude):
+        grams = {word[i:i + TRIGRAM] for word in words for i in range(len(word) - TRIGRAM + 1)}
+        rows = self.match(' OR '.join(self.phrase(gram) for gram in self.rarest(grams)), limit * self.candidates,
+                          exclude)
+        scored = []
+        for player_id, *fields in rows:
+            text = ' '.join(fields).lower()
+            score = sum(1 for gram in grams if gram in text) / len(grams)
+            if score >= self.similarity:
+                scored.append((score, player_id))
+        # sorted is stable, equal scores keep the bm25 order
+        return [player_id for score, player_id in sorted(scored, key=lambda item: -item[0])[:limit]]
+
+    def rarest(self, grams):
+        # a similar enough name misses at most this many grams, so it contains at least one of the rarest ones left
+        missable = len(grams) - math.ceil(len(grams) * self.similarity)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT term, doc FROM {VOCAB_TABLE} WHERE term IN ({", ".join(["%s"] * len(grams))})',
+                           list(grams))
+            frequencies = dict(cursor.fetchall())
+        return sorted(grams, key=lambda gram: (frequencies.get(gram, 0), gram))[:missable + 1]
+
+    def phrase(self, text):
+        return '"' + text.replace('"', '""') + '"'
+
+    def match(self, expression, limit, exclude=()):
+        sql = f'SELECT rowid, name, surname, nick FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s'
+        params = [expression]
+        if exclude:
+            sql += f' AND rowid NOT IN ({", ".join(["%s"] * len(exclude))})'
+            params += exclude
+        with connection.cursor() as cursor:
+            cursor.execute(sql + ' ORDER BY rank LIMIT %s', params + [limit])
+            return cursor.fetchall()
+
+
+def get_search_backend():
+    # PLAYER_SEARCH_BACKEND points to a class with search(query, limit) returning ranked player ids
+    path = getattr(settings, 'PLAYER_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == 'sqlite':
+        return SqliteSearchBackend()
+    return DatabaseSearchBackend()
+
+
+def search_players(query, limit=10):
+    ids = get_search_backend().search(query, limit)
+    players = Player.objects.in_bulk(ids)
+    return [players[player_id] for player_id in ids if player_id in players]
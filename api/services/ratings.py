@@ -0,0 +1,216 @@
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.utils import timezone
+
+from api.models import Match, MatchPerformance, Player, Team
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+INITIAL_RATING = 1500
+K_FACTOR = 32
+
+
+class RatingsError(RuntimeError):
+    pass
+
+
+def expected_score(rating, opponent_rating):
+    # works on floats and on numpy arrays
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+
+def rating_change(rating, opponent_rating, won):
+    return K_FACTOR * (won - expected_score(rating, opponent_rating))
+
+
+def shift_ratings(model, deltas):
+    # one statement adding each delta to the stored rating, so concurrent shifts do not overwrite each other
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    shift = Case(*[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()], output_field=FloatField())
+    model.objects.filter(pk__in=deltas).update(rating=F('rating') + shift, updated_at=timezone.now())
+
+
+def rate_performances(queryset):
+    # players are rated against the rating the opposing team had before the match, in the order matches were played
+    rows = list(queryset.filter(rating_change__isnull=True, match__rating_change__isnull=False).order_by(
+        'match__time', 'match').values_list('id', 'player', 'team', 'match__team1', 'match__team2',
+                                            'match__team1_rating', 'match__team2_rating', 'match__winner'))
+    if not rows:
+        return
+    with transaction.atomic():
+        ratings = dict(Player.objects.select_for_update().filter(
+            pk__in={row[1] for row in rows}).values_list('id', 'rating'))
+        deltas, rated = defaultdict(float), []
+        for performance_id, player_id, team_id, team1_id, team2_id, team1_rating, team2_rating, winner_id in rows:
+            if team_id not in (team1_id, team2_id):
+                continue
+            opponent_rating = team2_rating if team_id == team1_id else team1_rating
+            change = rating_change(ratings[player_id], opponent_rating, team_id == winner_id)
+            ratings[player_id] += change
+            deltas[player_id] += change
+            rated.append(MatchPerformance(pk=performance_id, rating_change=change))
+        shift_ratings(Player, deltas)
+        MatchPerformance.objects.bulk_update(rated, ['rating_change'])
+
+
+def unrate_performances(performances):
+    # performances carry the rating_change they had before the write
+    rated = [performance for performance in performances if performance.rating_change is not None]
+    if not rated:
+        return
+    deltas = defaultdict(float)
+    for performance in rated:
+        deltas[performance.player_id] -= performance.rating_change
+    shift_ratings(Player, deltas)
+    MatchPerformance.objects.filter(pk__in=[performance.pk for performance in rated]).update(rating_change=None)
+
+
+def rate_match(match):
+    # results entered late or corrected are rated against the current ratings,
+    # recompute_ratings replays the whole history in the order it was played
+    if match.winner_id is None or match.rating_change is not None:
+        return
+    with transaction.atomic():
+        ratings = dict(Team.objects.select_for_update().filter(
+            pk__in=(match.team1_id, match.team2_id)).values_list('id', 'rating'))
+        match.team1_rating, match.team2_rating = ratings[match.team1_id], ratings[match.team2_id]
+        match.rating_change = rating_change(match.team1_rating, match.team2_rating, match.winner_id == match.team1_id)
+        Match.objects.filter(pk=match.pk).update(team1_rating=match.team1_rating, team2_rating=match.team2_rating,
+                                                 rating_change=match.rating_change)
+        shift_ratings(Team, {match.team1_id: match.rating_change, match.team2_id: -match.rating_change})
+        rate_performances(MatchPerformance.objects.filter(match=match))
+
+
+def unrate_matches(matches):
+    # takes the changes of rated matches back from both teams and from every player who played them
+    rated = [match for match in matches if match.rating_change is not None]
+    if not rated:
+        return
+    deltas = defaultdict(float)
+    for match in rated:
+        deltas[match.team1_id] -= match.rating_change
+        deltas[match.team2_id] += match.rating_change
+    with transaction.atomic():
+        shift_ratings(Team, deltas)
+        unrate_performances(MatchPerformance.objects.filter(match__in=rated, rating_change__isnull=False).only(
+            'id', 'player', 'rating_change'))
+        Match.objects.filter(pk__in=[match.pk for match in rated]).update(team1_rating=None, team2_rating=None,
+                                                                            rating_change=None)
+
+
+def update_match_rating(previous, match):
+    # previous is the match as it was before the write, a rated match keeps its rating while its result holds
+    if previous.rating_change is not None and (previous.team1_id, previous.team2_id, previous.winner_id) == \
+            (match.team1_id, match.team2_id, match.winner_id):
+        return
+    with transaction.atomic():
+        unrate_matches([previous])
+        match.team1_rating = match.team2_rating = match.rating_change = None
+        rate_match(match)
+
+
+def dependency_levels(*keys):
+    # each event gets one level more than the last event sharing a key with it,
+    # events of one level share no key and can be rated together
+    last, levels = {}, []
+    for event_keys in zip(*(key.tolist() for key in keys)):
+        level = max(last.get(key, -1) for key in event_keys) + 1
+        for key in event_keys:
+            last[key] = level
+        levels.append(level)
+    return np.array(levels, dtype=np.int64)
+
+
+def occurrence_index(keys):
+    # how many events with the same key came before, the single key case of dependency_levels without the loop
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    index = np.empty(len(keys), dtype=np.int64)
+    index[order] = np.arange(len(keys)) - np.repeat(starts, np.diff(np.r_[starts, len(keys)]))
+    return index
+
+
+def level_groups(levels):
+    order = np.argsort(levels, kind='stable')
+    return np.split(order, np.cumsum(np.bincount(levels))[:-1]) if len(levels) else []
+
+
+def compute_ratings():
+    # replays every finished match in the order it was played, with the same updates as rate_match
+    if np is None:
+        raise RatingsError('Recomputing ratings needs numpy')
+    matches = Match.objects.filter(winner__isnull=False).order_by('time', 'id').values_list(
+        'id', 'team1', 'team2', 'winner')
+    match_ids, team1_ids, team2_ids, winner_ids = np.array(list(matches), dtype=np.int64).reshape(-1, 4).T
+    team_ids, team_index = np.unique(np.concatenate([team1_ids, team2_ids]), return_inverse=True)
+    team1_index, team2_index = np.split(team_index, 2)
+    team1_won = (winner_ids == team1_ids).astype(float)
+
+    team_ratings = np.full(len(team_ids), INITIAL_RATING, dtype=float)
+    team1_ratings, team2_ratings, changes = np.empty((3, len(match_ids)))
+    for group in level_groups(dependency_levels(team1_index, team2_index)):
+        team1_rating, team2_rating = team_ratings[team1_index[group]], team_ratings[team2_index[group]]
+        change = rating_change(team1_rating, team2_rating, team1_won[group])
+        team1_ratings[group], team2_ratings[group], changes[group] = team1_rating, team2_rating, change
+        team_ratings[team1_index[group]] += change
+        team_ratings[team2_index[group]] -= change
+
+    performances = MatchPerformance.objects.filter(match__winner__isnull=False).order_by(
+        'match__time', 'match', 'id').values_list('id', 'player', 'team', 'match')
+    performance_ids, player_ids, teams, performance_matches = np.array(
+        list(performances), dtype=np.int64).reshape(-1, 4).T
+    by_id = np.argsort(match_ids)
+    position = by_id[np.searchsorted(match_ids, performance_matches, sorter=by_id)]
+    on_team1 = teams == team1_ids[position]
+    played = on_team1 | (teams == team2_ids[position])
+    performance_ids, player_ids, position, on_team1 = (
+        performance_ids[played], player_ids[played], position[played], on_team1[played])
+    opponent_ratings = np.where(on_team1, team2_ratings[position], team1_ratings[position])
+    won = (on_team1 == (team1_won[position] == 1)).astype(float)
+
+    player_ids, player_index = np.unique(player_ids, return_inverse=True)
+    player_ratings = np.full(len(player_ids), INITIAL_RATING, dtype=float)
+    performance_changes = np.empty(len(performance_ids))
+    for group in level_groups(occurrence_index(player_index)):
+        change = rating_change(player_ratings[player_index[group]], opponent_ratings[group], won[group])
+        performance_changes[group] = change
+        player_ratings[player_index[group]] += change
+
+    return {
+        'teams': (team_ids, team_ratings),
+        'players': (player_ids, player_ratings),
+        'matches': (match_ids, team1_ratings, team2_ratings, changes),
+        'performances': (performance_ids, performance_changes),
+    }
+
+
+def update_rows(model, fields, columns):
+    # executemany of a plain UPDATE is much cheaper than bulk_update for hundreds of thousands of rows
+    ids, *values = columns
+    assignments = ', '.join(f'{connection.ops.quote_name(field)} = %s' for field in fields)
+    sql = f'UPDATE {connection.ops.quote_name(model._meta.db_table)} SET {assignments} WHERE id = %s'
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, list(zip(*(column.tolist() for column in values), ids.tolist())))
+
+
+def recompute_ratings():
+    computed = compute_ratings()
+    now = timezone.now()
+    with transaction.atomic():
+        for model in (Team, Player):
+            model.objects.update(rating=INITIAL_RATING, updated_at=now)
+        Match.objects.update(team1_rating=None, team2_rating=None, rating_change=None)
+        MatchPerformance.objects.update(rating_change=None)
+        update_rows(Team, ('rating',), computed['teams'])
+        update_rows(Player, ('rating',), computed['players'])
+        update_rows(Match, ('team1_rating', 'team2_rating', 'rating_change'), computed['matches'])
+        update_rows(MatchPerformance, ('rating_change',), computed['performances'])
+    return {name: len(columns[0]) for name, columns in computed.items()}
@@ -0,0 +1,68 @@
+# kept free of model imports, migrations and the post_migrate hook use it
+SEARCH_TABLE = 'api_player_search'
+VOCAB_TABLE = 'api_player_search_vocab'
+
+CREATE_TABLE = f'''
+CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+    name, surname, nick, content='api_player', content_rowid='id', tokenize='trigram'
+)'''
+
+# document frequency of every trigram, lets misspelt searches start from the rare ones
+CREATE_VOCAB_TABLE = f"CREATE VIRTUAL TABLE IF NOT EXISTS {VOCAB_TABLE} USING fts5vocab({SEARCH_TABLE}, 'row')"
+
+TRIGGERS = {
+    f'{SEARCH_TABLE}_insert': f'''
+CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert AFTER INSERT ON api_player BEGIN
+    INSERT INTO {SEARCH_TABLE}(rowid, name, surname, nick) VALUES (new.id, new.name, new.surname, new.nick);
+END''',
+    f'{SEARCH_TABLE}_delete': f'''
+CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete AFTER DELETE ON api_player BEGIN
+    INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name, surname, nick)
+    VALUES ('delete', old.id, old.name, old.surname, old.nick);
+END''',
+    f'{SEARCH_TABLE}_update': f'''
+CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update AFTER UPDATE OF name, surname, nick ON api_player BEGIN
+    INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name, surname, nick)
+    VALUES ('delete', old.id, old.name, old.surname, old.nick);
+    INSERT INTO {SEARCH_TABLE}(rowid, name, surname, nick) VALUES (new.id, new.name, new.surname, new.nick);
+END''',
+}
+
+
+def search_table_exists(cursor):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [SEARCH_TABLE])
+    return cursor.fetchone() is not None
+
+
+def install_search_index(connection):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_TABLE)
+        cursor.execute(CREATE_VOCAB_TABLE)
+        for sql in TRIGGERS.values():
+            cursor.execute(sql)
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
+
+
+def uninstall_search_index(connection):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name in TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        cursor.execute(f'DROP TABLE IF EXISTS {VOCAB_TABLE}')
+        cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+def repair_search_index(connection):
+    # sqlite drops the triggers whenever a migration remakes api_player, this puts them back
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        if not search_table_exists(cursor):
+            return
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'api_player'")
+        present = {row[0] for row in cursor.fetchall()}
+    if not present.issuperset(TRIGGERS):
+        install_search_index(connection)
@@ -0,0 +1,87 @@
+from datetime import datetime, time
+
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from api.models import Match
+
+STANDING_FIELDS = ('team', 'matches', 'wins', 'losses', 'sets_won', 'sets_lost', 'points_won', 'points_lost',
+                   'ranking_points')
+TEAM1_POINTS = ' + '.join(f'COALESCE(set{i}_team1_score, 0)' for i in range(1, 6))
+
+
+def day_start(value):
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(value)
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def ratio(won, lost):
+    if lost:
+        return round(won / lost, 3)
+    return None
+
+
+def sortable_ratio(value, won):
+    # nothing lost beats any ratio, unless nothing was won either
+    if value is not None:
+        return value
+    return float('inf') if won else 0
+
+
+def standing_order(row):
+    return (-row['ranking_points'], -row['wins'], -sortable_ratio(row['sets_ratio'], row['sets_won']),
+            -sortable_ratio(row['points_ratio'], row['points_won']), row['team'])
+
+
+def compute_standings(team_ids=None, start=None, end=None):
+    # one grouped statement over the stored results, each decided match counted once from each side,
+    # a match entered halfway earns nothing until one side has its sets
+    conditions, params = ['(team1_sets >= %s OR team2_sets >= %s)'], [Match.SETS_TO_WIN, Match.SETS_TO_WIN]
+    if team_ids is not None:
+        placeholders = ', '.join(['%s'] * len(team_ids))
+        conditions.append(f'team1_id IN ({placeholders}) AND team2_id IN ({placeholders})')
+        params += [*team_ids, *team_ids]
+    if start is not None:
+        conditions.append('time >= %s')
+        params.append(connection.ops.adapt_datetimefield_value(start))
+    if end is not None:
+        conditions.append('time < %s')
+        params.append(connection.ops.adapt_datetimefield_value(end))
+    where = ' AND '.join(conditions)
+    table = connection.ops.quote_name(Match._meta.db_table)
+
+    sql = f'''
+        SELECT team_id, COUNT(*),
+               SUM(CASE WHEN own_sets > opponent_sets THEN 1 ELSE 0 END),
+               SUM(CASE WHEN own_sets < opponent_sets THEN 1 ELSE 0 END),
+               SUM(own_sets), SUM(opponent_sets), SUM(own_points), SUM(opponent_points),
+               SUM(CASE
+                   WHEN own_sets > opponent_sets AND opponent_sets = 2 THEN 2
+                   WHEN own_sets > opponent_sets THEN 3
+                   WHEN own_sets = 2 THEN 1
+                   ELSE 0
+               END)
+        FROM (
+            SELECT team1_id AS team_id, team1_sets AS own_sets, team2_sets AS opponent_sets,
+                   {TEAM1_POINTS} AS own_points, total_points - ({TEAM1_POINTS}) AS opponent_points
+            FROM {table} WHERE {where}
+            UNION ALL
+            SELECT team2_id, team2_sets, team1_sets, total_points - ({TEAM1_POINTS}), {TEAM1_POINTS}
+            FROM {table} WHERE {where}
+        ) results
+        GROUP BY team_id'''
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params + params)
+        rows = {row[0]: dict(zip(STANDING_FIELDS, row)) for row in cursor.fetchall()}
+
+    # teams of the league without a finished match still get their line
+    for team_id in team_ids or ():
+        rows.setdefault(team_id, dict(dict.fromkeys(STANDING_FIELDS, 0), team=team_id))
+    standings = list(rows.values())
+    for row in standings:
+        row['sets_ratio'] = ratio(row['sets_won'], row['sets_lost'])
+        row['points_ratio'] = ratio(row['points_won'], row['points_lost'])
+    return sorted(standings, key=standing_order)
@@ -0,0 +1,108 @@
+import hashlib
+import time
+
+from django.core.cache import caches
+from django.db import transaction
+
+STATS_CACHE_ALIAS = 'stats'
+GENERATION_KEY = 'stats:generation'
+LEADERBOARDS_KEY = 'stats:leaderboards:version'
+HITS_KEY = 'stats:hits'
+MISSES_KEY = 'stats:misses'
+MISSING = object()
+
+
+def stats_cache():
+    return caches[STATS_CACHE_ALIAS]
+
+
+def version_key(kind, object_id):
+    return f'stats:{kind}:{object_id}:version'
+
+
+def get_versions(cache, keys):
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # a fresh version never collides with one that got evicted, so old entries stay unreachable
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return versions
+
+
+def bump_versions(cache, keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def count(cache, key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def read_through(scopes, name, compute, cacheable=None):
+    # the key carries the version of every scope, bumping any of them drops the entry
+    cache = stats_cache()
+    scopes = [GENERATION_KEY, *scopes]
+    versions = get_versions(cache, scopes)
+    key = f'stats:{name}:' + ':'.join(str(versions[scope]) for scope in scopes)
+
+    value = cache.get(key, MISSING)
+    if value is MISSING:
+        count(cache, MISSES_KEY)
+        value = compute()
+        if cacheable is None or cacheable(value):
+            cache.set(key, value)
+    else:
+        count(cache, HITS_KEY)
+    return value
+
+
+def cached_stats(name, compute, player_id=None, team_id=None, amount=None):
+    # entries of a player are scoped to the player alone, every write touching them also touches the player
+    scope = version_key('player', player_id) if player_id is not None else version_key('team', team_id)
+    return read_through([scope], f'{name}:{player_id}:{team_id}:{amount}', compute)
+
+
+def cached_leaderboard(options, compute):
+    # leaderboards mix every player, any performance write drops all of them
+    digest = hashlib.md5(repr(sorted(options.items())).encode()).hexdigest()
+    return read_through([LEADERBOARDS_KEY], f'leaderboard:{digest}', compute)
+
+
+def cached_head_to_head(kind, side_a, side_b, compute, cacheable):
+    # match writes bump both teams and the players who played in the match
+    scopes = [version_key(kind, side_a), version_key(kind, side_b)]
+    return read_through(scopes, f'head_to_head:{kind}:{side_a}:{side_b}', compute, cacheable)
+
+
+def invalidate(keys):
+    cache = stats_cache()
+    bump_versions(cache, keys)
+    # bumped again after commit, a read between the write and the commit may have cached the old values
+    transaction.on_commit(lambda: bump_versions(cache, keys))
+
+
+def invalidate_stats(player_ids=(), team_ids=()):
+    keys = [version_key('player', player_id) for player_id in set(player_ids)]
+    keys += [version_key('team', team_id) for team_id in set(team_ids)]
+    if keys:
+        invalidate(keys + [LEADERBOARDS_KEY])
+
+
+def invalidate_all_stats():
+    invalidate([GENERATION_KEY])
+
+
+def get_counters():
+    counters = stats_cache().get_many([HITS_KEY, MISSES_KEY])
+    return counters.get(HITS_KEY, 0), counters.get(MISSES_KEY, 0)
+
+
+def reset_counters():
+    stats_cache().delete_many([HITS_KEY, MISSES_KEY])
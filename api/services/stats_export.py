@@ -0,0 +1,113 @@
+import csv
+import json
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Exists, OuterRef, Q
+
+from api.models import Match, MatchPerformance
+from api.services.leaderboards import season_range
+from api.services.performance_stats import SET_POSITION_FIELDS, STAT_FIELDS
+from api.services.standings import day_start
+
+SCORE_FIELDS = tuple(f'set{i}_team{team}_score' for team in (1, 2) for i in range(1, 6))
+# performance columns are the ones import_stats reads, an export can be imported into another instance,
+# where the player ids are unknown and the players are matched or created by name
+PERFORMANCE_COLUMNS = {
+    'id': 'id',
+    'match': 'match',
+    'time': 'match__time',
+    'team1': 'match__team1__name',
+    'team2': 'match__team2__name',
+    **{field: f'match__{field}' for field in SCORE_FIELDS},
+    'team': 'team__name',
+    'player': 'player',
+    'player_name': 'player__name',
+    'player_surname': 'player__surname',
+    'player_year_of_birth': 'player__year_of_birth',
+    'player_height': 'player__height',
+    'player_position': 'player__position',
+    **{field: field for field in SET_POSITION_FIELDS + STAT_FIELDS},
+}
+MATCH_COLUMNS = {
+    'id': 'id',
+    'time': 'time',
+    'team1': 'team1__name',
+    'team2': 'team2__name',
+    **{field: field for field in SCORE_FIELDS},
+    'team1_sets': 'team1_sets',
+    'team2_sets': 'team2_sets',
+    'winner': 'winner__name',
+    'total_points': 'total_points',
+}
+OUTPUTS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+CHUNK_SIZE = 2000
+
+
+def parse_export_filters(params):
+    # params are strings, from query params or command options, both ends of the date range are inclusive days
+    filters = {
+        'team_id': int(params['team']) if params.get('team') else None,
+        'player_id': int(params['player']) if params.get('player') else None,
+        'start': day_start(params['from']) if params.get('from') else None,
+        'end': day_start(params['to']) + timedelta(days=1) if params.get('to') else None,
+    }
+    if params.get('season'):
+        start, end = season_range(int(params['season']))
+        filters['start'] = max(start, filters['start']) if filters['start'] else start
+        filters['end'] = min(end, filters['end']) if filters['end'] else end
+    return filters
+
+
+def performance_rows(team_id=None, player_id=None, start=None, end=None):
+    queryset = MatchPerformance.objects.order_by('match__time', 'match', 'id')
+    if team_id is not None:
+        queryset = queryset.filter(team=team_id)
+    if player_id is not None:
+        queryset = queryset.filter(player=player_id)
+    if start is not None:
+        queryset = queryset.filter(match__time__gte=start)
+    if end is not None:
+        queryset = queryset.filter(match__time__lt=end)
+    return queryset.values_list(*PERFORMANCE_COLUMNS.values()), tuple(PERFORMANCE_COLUMNS)
+
+
+def match_rows(team_id=None, player_id=None, start=None, end=None):
+    queryset = Match.objects.order_by('time', 'id')
+    if team_id is not None:
+        queryset = queryset.filter(Q(team1=team_id) | Q(team2=team_id))
+    if player_id is not None:
+        queryset = queryset.filter(Exists(MatchPerformance.objects.filter(match=OuterRef('pk'), player=player_id)))
+    if start is not None:
+        queryset = queryset.filter(time__gte=start)
+    if end is not None:
+        queryset = queryset.filter(time__lt=end)
+    return queryset.values_list(*MATCH_COLUMNS.values()), tuple(MATCH_COLUMNS)
+
+
+EXPORTS = {'performances': performance_rows, 'matches': match_rows}
+
+
+class Echo:
+    # csv.writer only needs write, which hands the formatted line straight back
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows, columns):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(rows, columns):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def export_lines(kind, output, chunk_size=CHUNK_SIZE, **filters):
+    # flat tuples of one joined query read in chunks, memory stays flat whatever the size of the export
+    queryset, columns = EXPORTS[kind](**filters)
+    rows = queryset.iterator(chunk_size=chunk_size)
+    return csv_lines(rows, columns) if output == 'csv' else ndjson_lines(rows, columns)
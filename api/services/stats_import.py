@@ -0,0 +1,205 @@
+import csv
+import json
+import os
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from api.models import Match, MatchPerformance, Player, Team, normalize_team_name
+from api.services.performance_sheets import UPSERT_FIELDS
+from api.services.performance_stats import SET_POSITION_FIELDS, STAT_FIELDS
+
+FORMATS = ('csv', 'jsonl')
+SCORE_FIELDS = tuple(f'set{i}_team{team}_score' for team in (1, 2) for i in range(1, 6))
+PLAYER_FIELDS = ('year_of_birth', 'height', 'position')
+REQUIRED_FIELDS = ('time', 'team1', 'team2', 'team')
+
+
+class StatsImportError(ValueError):
+    pass
+
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    raise StatsImportError(f'Unknown format of {path}, pass it explicitly')
+
+
+def read_rows(file, format):
+    # one row at a time, a season never has to fit in memory
+    if format == 'csv':
+        reader = csv.DictReader(file)
+        try:
+            yield from reader
+        except csv.Error as e:
+            raise StatsImportError(f'Line {reader.line_num}: {e}')
+    else:
+        for number, line in enumerate(file, start=1):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    raise StatsImportError(f'Line {number}: {e}')
+
+
+def read_checkpoint(path):
+    try:
+        with open(path) as file:
+            return json.load(file)['rows']
+    except FileNotFoundError:
+        return 0
+
+
+def write_checkpoint(path, rows):
+    # replaced atomically, an interrupted write leaves the previous checkpoint
+    with open(path + '.tmp', 'w') as file:
+        json.dump({'rows': rows}, file)
+    os.replace(path + '.tmp', path)
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+class StatsImporter:
+    # teams, players and matches are resolved through maps loaded once, each batch only inserts what is missing
+    def __init__(self, owner=None, batch_size=500):
+        self.owner = owner
+        self.batch_size = batch_size
+        self.teams = dict(Team.objects.values_list('normalized_name', 'id'))
+        self.player_names = {player_id: (name.casefold(), surname.casefold())
+                             for player_id, name, surname in Player.objects.values_list('id', 'name', 'surname')}
+        self.players = {key: player_id for player_id, key in self.player_names.items()}
+        self.matches = {(team1_id, team2_id, time): match_id for match_id, team1_id, team2_id, time in
+                        Match.objects.values_list('id', 'team1', 'team2', 'time')}
+
+    def import_batch(self, rows, first_row):
+        parsed = [self.parse(row, first_row + i) for i, row in enumerate(rows)]
+        with transaction.atomic():
+            self.create_teams(parsed)
+            self.create_players(parsed)
+            self.create_matches(parsed)
+            performances = {}
+            for row in parsed:
+                performance = self.performance(row)
+                performances[performance.player_id, performance.match_id] = performance
+            MatchPerformance.objects.bulk_create(performances.values(), batch_size=self.batch_size,
+                                                 update_conflicts=True, unique_fields=('player', 'match'),
+                                                 update_fields=UPSERT_FIELDS)
+        return len(performances)
+
+    def parse(self, row, number):
+        if not isinstance(row, dict):
+            raise StatsImportError(f'Row {number}: expected an object, got {type(row).__name__}')
+        missing = [field for field in REQUIRED_FIELDS if not row.get(field)]
+        if missing:
+            raise StatsImportError(f'Row {number}: missing {", ".join(missing)}')
+        try:
+            parsed = {
+                'number': number,
+                'time': self.parse_time(row['time']),
+                'team1': row['team1'].strip(),
+                'team2': row['team2'].strip(),
+                'team': row['team'].strip(),
+                'player': int(row['player']) if row.get('player') else None,
+                'player_name': (row.get('player_name') or '').strip(),
+                'player_surname': (row.get('player_surname') or '').strip(),
+            }
+            for field in PLAYER_FIELDS:
+                parsed[f'player_{field}'] = row.get(f'player_{field}') or None
+            for field in SCORE_FIELDS + SET_POSITION_FIELDS:
+                parsed[field] = int(row[field]) if row.get(field) not in (None, '') else None
+            for field in STAT_FIELDS:
+                parsed[field] = int(row.get(field) or 0)
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            raise StatsImportError(f'Row {number}: {e!r}')
+        if normalize_team_name(parsed['team']) not in (normalize_team_name(parsed['team1']),
+                                                       normalize_team_name(parsed['team2'])):
+            raise StatsImportError(f'Row {number}: team {parsed["team"]} did not play the match')
+        if parsed['player'] is None and not (parsed['player_name'] and parsed['player_surname']):
+            raise StatsImportError(f'Row {number}: a player id or player_name and player_surname are needed')
+        return parsed
+
+    @staticmethod
+    def parse_time(value):
+        time = parse_datetime(value.strip())
+        if time is None:
+            raise ValueError(f'Wrong time {value}')
+        if settings.USE_TZ and timezone.is_naive(time):
+            time = timezone.make_aware(time)
+        return time
+
+    def create_teams(self, rows):
+        missing = {}
+        for row in rows:
+            for field in ('team1', 'team2'):
+                if normalize_team_name(row[field]) not in self.teams:
+                    missing.setdefault(normalize_team_name(row[field]), row[field])
+        if not missing:
+            return
+        if self.owner is None:
+            raise StatsImportError(f'Teams {", ".join(missing.values())} do not exist, pass an owner to create them')
+        # bulk_create skips save, so normalized_name is set here
+        teams = Team.objects.bulk_create([Team(name=name, normalized_name=key, description='', owner=self.owner)
+                                          for key, name in missing.items()])
+        self.teams.update((team.normalized_name, team.id) for team in teams)
+
+    def player_key(self, row):
+        name = (row['player_name'].casefold(), row['player_surname'].casefold()) \
+            if row['player_name'] and row['player_surname'] else None
+        # an id from another instance is unknown here or belongs to someone else, the name decides then
+        if row['player'] is not None and (name is None or self.player_names.get(row['player']) == name):
+            return row['player']
+        return name
+
+    def create_players(self, rows):
+        missing = {}
+        for row in rows:
+            key = self.player_key(row)
+            if isinstance(key, int):
+                if key not in self.player_names:
+                    raise StatsImportError(f'Row {row["number"]}: player {key} does not exist')
+            elif key not in self.players and key not in missing:
+                if not all(row[f'player_{field}'] for field in PLAYER_FIELDS):
+                    raise StatsImportError(f'Row {row["number"]}: new player needs year_of_birth, height and position')
+                missing[key] = Player(name=row['player_name'], surname=row['player_surname'],
+                                      **{field: row[f'player_{field}'] for field in PLAYER_FIELDS})
+        if missing:
+            players = Player.objects.bulk_create(missing.values())
+            for key, player in zip(missing, players):
+                self.players[key] = player.id
+                self.player_names[player.id] = key
+
+    def match_key(self, row):
+        return self.teams[normalize_team_name(row['team1'])], self.teams[normalize_team_name(row['team2'])], row['time']
+
+    def create_matches(self, rows):
+        missing = {}
+        for row in rows:
+            key = self.match_key(row)
+            if key not in self.matches and key not in missing:
+                team1_id, team2_id, time = key
+                match = Match(team1_id=team1_id, team2_id=team2_id, time=time,
+                              **{field: row[field] for field in SCORE_FIELDS if row[field] is not None})
+                # bulk_create skips save, which fills the stored result
+                match.update_result()
+                missing[key] = match
+        if missing:
+            matches = Match.objects.bulk_create(missing.values())
+            self.matches.update((key, match.id) for key, match in zip(missing, matches))
+
+    def performance(self, row):
+        key = self.player_key(row)
+        return MatchPerformance(
+            player_id=key if isinstance(key, int) else self.players[key],
+            match_id=self.matches[self.match_key(row)],
+            team_id=self.teams[normalize_team_name(row['team'])],
+            **{field: row[field] for field in SET_POSITION_FIELDS + STAT_FIELDS})
@@ -0,0 +1,109 @@
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, F, Sum, Value, When
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from api.models import MatchPerformance
+from api.services.leaderboards import BALANCE_STATS, SUMMED_STATS
+from api.services.performance_stats import SET_POSITION_FIELDS, STAT_FIELDS
+
+STATS = STAT_FIELDS + tuple(SUMMED_STATS) + tuple(BALANCE_STATS)
+BUCKETS = {'match': None, 'week': TruncWeek, 'month': TruncMonth}
+MAX_WINDOW = 100
+
+
+class TimeseriesError(ValueError):
+    pass
+
+
+def stat_expression(stat):
+    if stat in SUMMED_STATS:
+        positive, negative = SUMMED_STATS[stat], ()
+    elif stat in BALANCE_STATS:
+        positive, negative = BALANCE_STATS[stat]
+    else:
+        positive, negative = (stat,), ()
+    expression = sum((F(field) for field in positive[1:]), F(positive[0]))
+    for field in negative:
+        expression = expression - F(field)
+    return expression
+
+
+def sets_played():
+    # per row version of the set count in performance_aggregates
+    cases = [Case(When(**{f'{field}__isnull': False}, then=Value(1)), default=Value(0)) for field in SET_POSITION_FIELDS]
+    return sum(cases[1:], cases[0])
+
+
+def bucket_queryset(player_id, stat, bucket, team_id=None):
+    queryset = MatchPerformance.objects.filter(player=player_id).order_by()
+    if team_id is not None:
+        queryset = queryset.filter(team=team_id)
+    if BUCKETS[bucket] is None:
+        return queryset.values('match', time=F('match__time'), value=stat_expression(stat), sets=sets_played()), \
+            ('time', 'match_id')
+    return queryset.values(time=BUCKETS[bucket]('match__time')).annotate(
+        value=Sum(stat_expression(stat)), sets=Sum(sets_played())), ('time',)
+
+
+def to_datetime(value, tzinfo):
+    # raw rows skip the field converters, sqlite hands datetimes back as text
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if settings.USE_TZ and timezone.is_naive(value):
+        value = timezone.make_aware(value, tzinfo)
+    return value
+
+
+def per_set(value, sets):
+    return round(value / sets, 2) if sets else 0
+
+
+def downsample(rows, points):
+    # evenly spaced rows, the first and the latest one are always kept
+    if points is None or len(rows) <= points:
+        return rows
+    if points == 1:
+        return rows[-1:]
+    return [rows[round(i * (len(rows) - 1) / (points - 1))] for i in range(points)]
+
+
+def performance_timeseries(player_id, stat, window=5, bucket='match', points=None, team_id=None):
+    if stat not in STATS:
+        raise TimeseriesError(f'Unknown stat {stat}')
+    if bucket not in BUCKETS:
+        raise TimeseriesError(f'Unknown bucket {bucket}')
+    if not 1 <= window <= MAX_WINDOW:
+        raise TimeseriesError(f'Window has to be between 1 and {MAX_WINDOW}')
+    if points is not None and points < 1:
+        raise TimeseriesError('Points have to be positive')
+
+    # the window runs over the grouped buckets, which the ORM cannot express, so the grouped query is wrapped
+    queryset, order = bucket_queryset(player_id, stat, bucket, team_id)
+    inner_sql, params = queryset.query.sql_with_params()
+    columns = [connection.ops.quote_name(column) for column in ('value', 'sets', *order)]
+    value, sets = columns[:2]
+    sql = f'''
+        SELECT {", ".join(columns)},
+               SUM({value}) OVER rolling, SUM({sets}) OVER rolling
+        FROM ({inner_sql}) buckets
+        WINDOW rolling AS (ORDER BY {", ".join(columns[2:])} ROWS BETWEEN {window - 1} PRECEDING AND CURRENT ROW)
+        ORDER BY {", ".join(columns[2:])}'''
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    # match times are stored in UTC, buckets are truncated in the current time zone
+    tzinfo = dt_timezone.utc if BUCKETS[bucket] is None else timezone.get_current_timezone()
+    series = []
+    for value, sets, time, *match, rolling_value, rolling_sets in rows:
+        point = {'time': to_datetime(time, tzinfo), 'sets': sets, 'value': per_set(value, sets),
+                 'rolling_average': per_set(rolling_value, rolling_sets)}
+        if match:
+            point['match'] = match[0]
+        series.append(point)
+    return downsample(series, points)
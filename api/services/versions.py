@@ -0,0 +1,20 @@
+from django.utils import timezone
+
+from api.models import Player, Team
+
+
+def touch(queryset):
+    # bumps updated_at of rows whose serialized form embeds related rows that just changed
+    return queryset.update(updated_at=timezone.now())
+
+
+def touch_commented_object(content_type, object_id):
+    return touch(content_type.model_class().objects.filter(pk=object_id))
+
+
+def touch_player_teams(player):
+    return touch(Team.objects.filter(players=player))
+
+
+def touch_user_players(*users):
+    return touch(Player.objects.filter(player_profile__user__in=users))
@@ -0,0 +1,12 @@
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from api.tests.factories import UserFactory
+
+
+class TokenAPITestCase(APITestCase):
+    def authenticate(self, user=None):
+        # requests go through TokenAuthentication like the clients' do, a new user is made when none is given
+        user = user or UserFactory()
+        token, _ = Token.objects.get_or_create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return user
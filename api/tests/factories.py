@@ -12,7 +12,7 @@ class UserFactory(DjangoModelFactory):
     class Meta:
         model = User
 
-    username = factory.Faker('user_name')
+    username = factory.Sequence(lambda n: f'user{n}')
     email = factory.Faker('email')
     password = factory.Faker('password')
 
@@ -47,7 +47,7 @@ class PlayerMembershipFactory(DjangoModelFactory):
     player = factory.SubFactory(PlayerFactory)
     team = factory.SubFactory(TeamFactory)
     date_joined = factory.Faker('date_this_decade')
-    date_left = factory.Faker('date_this_decade', before_now=True)
+    date_left = factory.Faker('date_this_decade', before_today=True)
 
 
 class UserProfileFactory(DjangoModelFactory):
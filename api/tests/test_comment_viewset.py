@@ -0,0 +1,50 @@
+from django.contrib.contenttypes.models import ContentType
+from rest_framework import status
+from api.models import Comment, Team
+from api.tests.factories import TeamFactory, UserProfileFactory
+from api.tests.base import TokenAPITestCase
+
+
+class TestCommentViewset(TokenAPITestCase):
+    def setUp(self):
+        self.team = TeamFactory()
+        content_type = ContentType.objects.get_for_model(Team)
+        self.comments = [
+            Comment.objects.create(user=UserProfileFactory().user, description=f'Comment {i}',
+                                   content_type=content_type, object_id=self.team.id)
+            for i in range(5)
+        ]
+        Comment.objects.create(user=self.comments[0].user, description='Other team', content_type=content_type,
+                               object_id=TeamFactory().id)
+
+    def test_list_object_comments_with_cursor(self):
+        url = '/api/comments/?content_type=team&page_size=3&object_id=' + str(self.team.id)
+        with self.assertNumQueries(2):
+            first_page = self.client.get(url, format='json')
+        second_page = self.client.get(first_page.data['next'], format='json')
+
+        self.assertEqual(first_page.status_code, status.HTTP_200_OK)
+        self.assertEqual([comment['description'] for comment in first_page.data['results'] + second_page.data['results']],
+                         [comment.description for comment in reversed(self.comments)])
+        self.assertIsNone(second_page.data['next'])
+
+    def test_list_object_comments_without_cursor(self):
+        response = self.client.get('/api/comments/?content_type=team&object_id=' + str(self.team.id), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertCountEqual([comment['description'] for comment in response.data],
+                              [comment.description for comment in self.comments])
+
+    def test_retrieve_team_comments_count(self):
+        response = self.client.get('/api/teams/' + str(self.team.id) + '/', format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['comments_count'], 5)
+
+    def test_new_comment_modifies_commented_object(self):
+        url = '/api/teams/' + str(self.team.id) + '/'
+        etag = self.client.get(url, format='json')['ETag']
+        self.authenticate(self.comments[0].user)
+        self.client.post('/api/comments/', {'content_type': 'team', 'object_id': self.team.id,
+                                            'user': self.comments[0].user.id, 'description': 'New'}, format='json')
+        response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['comments_count'], 6)
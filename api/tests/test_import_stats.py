@@ -0,0 +1,101 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from rest_framework.test import APITestCase
+
+from api.models import Match, MatchPerformance, Player, PerformanceTotals, Team
+from api.services.stats_import import read_checkpoint
+from api.tests.factories import UserFactory, PlayerFactory, MatchFactory, MatchPerformanceFactory, TeamFactory
+
+
+class TestImportStats(APITestCase):
+    def tmp_dir(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        return directory.name
+
+    def test_import_stats(self):
+        owner = UserFactory()
+        team = TeamFactory(name='Home')
+        player = PlayerFactory()
+        lines = ['time,team1,team2,set1_team1_score,set1_team2_score,set2_team1_score,set2_team2_score,'
+                 'set3_team1_score,set3_team2_score,team,player,player_name,player_surname,player_year_of_birth,'
+                 'player_height,player_position,set1_position,spike,dig']
+        # home wins 3:0
+        scores = '25,20,25,18,25,23'
+        for day in range(1, 4):
+            lines += [f'2023-01-0{day}T18:00:00,home,Away,{scores},Home,{player.id},,,,,,1,{day},0',
+                      f'2023-01-0{day}T18:00:00,home,Away,{scores},Away,,Jan,Kowalski,1990,190,OH,1,0,{day}']
+        path = os.path.join(self.tmp_dir(), 'season.csv')
+        with open(path, 'w') as file:
+            file.write('\n'.join(lines[:5]) + '\nbroken,row\n')
+
+        with self.assertRaises(CommandError):
+            call_command('import_stats', path, '--owner', owner.username, '--batch-size', '2', stdout=StringIO())
+        self.assertEqual(read_checkpoint(path + '.checkpoint'), 4)
+        with open(path, 'w') as file:
+            file.write('\n'.join(lines) + '\n')
+        call_command('import_stats', path, '--owner', owner.username, '--batch-size', '2', '--resume',
+                     stdout=StringIO())
+
+        away = Team.objects.get(name='Away')
+        imported = Player.objects.get(surname='Kowalski')
+        self.assertEqual(Match.objects.filter(team1=team, team2=away, winner=team).count(), 3)
+        self.assertEqual(PerformanceTotals.objects.get(player=player, team=None).spike, 6)
+        self.assertEqual(PerformanceTotals.objects.get(player=imported, team=away).dig, 6)
+        self.assertEqual(imported.playerrecords.dig, 3)
+        call_command('rebuild_performance_totals', '--check', stdout=StringIO())
+
+    def test_export_round_trips_through_import(self):
+        for match in MatchFactory.create_batch(size=2):
+            MatchPerformanceFactory(match=match, team=match.team1)
+            MatchPerformanceFactory(match=match, team=match.team2)
+        expected = sorted(MatchPerformance.objects.values_list('player', 'team', 'match__time', 'spike', 'dig'))
+        path = os.path.join(self.tmp_dir(), 'performances.csv')
+        call_command('export_stats', 'performances', '--file', path, stdout=StringIO())
+
+        Match.objects.all().delete()
+        call_command('import_stats', path, stdout=StringIO())
+        self.assertListEqual(
+            sorted(MatchPerformance.objects.values_list('player', 'team', 'match__time', 'spike', 'dig')), expected)
+        call_command('rebuild_performance_totals', '--check', stdout=StringIO())
+
+    def test_export_imports_into_another_instance(self):
+        for match in MatchFactory.create_batch(size=2):
+            MatchPerformanceFactory(match=match, team=match.team1)
+            MatchPerformanceFactory(match=match, team=match.team2)
+        fields = ('player__name', 'player__surname', 'team__name', 'match__time', 'spike', 'dig')
+        expected = sorted(MatchPerformance.objects.values_list(*fields))
+        path = os.path.join(self.tmp_dir(), 'performances.csv')
+        call_command('export_stats', 'performances', '--file', path, stdout=StringIO())
+
+        # the exported ids are unknown here, or taken by another player
+        other = MatchPerformance.objects.first().player
+        Team.objects.all().delete()
+        Player.objects.exclude(pk=other.pk).delete()
+        other.name, other.surname = 'Someone', 'Else'
+        other.save()
+        call_command('import_stats', path, '--owner', UserFactory().username, stdout=StringIO())
+        self.assertListEqual(sorted(MatchPerformance.objects.values_list(*fields)), expected)
+        self.assertFalse(other.matchperformance_set.exists())
+        call_command('rebuild_performance_totals', '--check', stdout=StringIO())
+
+    def test_import_stats_rejects_broken_rows(self):
+        directory = self.tmp_dir()
+        files = {
+            'short.csv': 'time,team1,team2,team,player\n2023-01-01T18:00:00,Home\n',
+            'broken.jsonl': '{"time": "2023-01-01T18:00:00", "team1": "Home", "team2": "Away", "team": "Home"}\n'
+                            '{"time": \n',
+            'list.jsonl': '["2023-01-01T18:00:00", "Home"]\n',
+        }
+        for name, content in files.items():
+            path = os.path.join(directory, name)
+            with open(path, 'w') as file:
+                file.write(content)
+            with self.assertRaises(CommandError) as context:
+                call_command('import_stats', path, stdout=StringIO())
+            self.assertRegex(str(context.exception), r'^(Row|Line) [12]:')
+        self.assertFalse(MatchPerformance.objects.exists())
@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from rest_framework import status
+
+from api.services.leaderboards import current_season, season_range
+from api.services.performance_totals import rebuild_totals
+from api.tests.factories import MatchFactory, MatchPerformanceFactory, PlayerFactory, TeamFactory
+from api.tests.base import TokenAPITestCase
+
+
+class TestLeaderboardViewset(TokenAPITestCase):
+    def setUp(self):
+        self.team = TeamFactory()
+        self.players = PlayerFactory.create_batch(size=3, position='OH')
+        # spike_point totals 30, 24 and 6, over 2, 3 and 1 matches of three sets
+        for player, spike_points in zip(self.players, ((10, 20), (8, 8, 8), (6,))):
+            for spike_point in spike_points:
+                MatchPerformanceFactory(player=player, team=self.team, spike=20, spike_point=spike_point,
+                                        spike_error=0, spike_block=0, set4_position=None, set5_position=None)
+        rebuild_totals()
+
+    def ranking(self, query):
+        response = self.client.get('/api/leaderboards/?' + query, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(row['player']['id'], row['value']) for row in response.data['results']]
+
+    def test_total_leaderboard(self):
+        with self.assertNumQueries(2):
+            ranking = self.ranking('stat=spike_point&limit=2')
+        self.assertListEqual(ranking, [(self.players[0].id, 30), (self.players[1].id, 24)])
+
+    def test_per_match_leaderboard_with_threshold(self):
+        ranking = self.ranking('stat=spike_point&per=match&min_matches=2')
+        self.assertListEqual(ranking, [(self.players[0].id, 15), (self.players[1].id, 8)])
+
+    def test_percentage_leaderboard(self):
+        ranking = self.ranking('stat=spike_kill_percentage&scope=team&team=' + str(self.team.id))
+        self.assertListEqual(ranking, [(self.players[0].id, 75), (self.players[1].id, 40),
+                                       (self.players[2].id, 30)])
+
+    def test_season_leaderboard(self):
+        start, end = season_range(current_season() - 1)
+        MatchPerformanceFactory(player=self.players[2], team=self.team, spike_point=50,
+                                match=MatchFactory(time=start + timedelta(days=1)))
+        self.assertListEqual(self.ranking('stat=spike_point&scope=season&limit=1'), [(self.players[0].id, 30)])
+        self.assertListEqual(self.ranking(f'stat=spike_point&scope=season&season={start.year}'),
+                             [(self.players[2].id, 50)])
+
+    def test_wrong_params(self):
+        for query in ('stat=height', 'stat=dig&per=minute', 'scope=team', 'limit=x', 'scope=season&season=0',
+                      'scope=season&season=9999', 'scope=season&season=99999'):
+            response = self.client.get('/api/leaderboards/?' + query, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_leaderboard_refreshes_after_new_sheet(self):
+        self.assertEqual(self.ranking('stat=spike_point&limit=1')[0][0], self.players[0].id)
+        self.authenticate()
+        self.client.post('/api/match-performances/', [{'player': self.players[2].id, 'match': MatchFactory().id,
+                                                       'team': self.team.id, 'spike_point': 40}], format='json')
+        self.assertListEqual(self.ranking('stat=spike_point&limit=1'), [(self.players[2].id, 46)])
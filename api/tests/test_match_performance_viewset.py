@@ -1,15 +1,24 @@
+import csv
+import json
+from datetime import timedelta
+from io import StringIO
 from operator import attrgetter
 
-from rest_framework.test import APITestCase
+from django.core.management import call_command
+from django.utils import timezone
+
 from rest_framework import status
 from django.contrib.auth.models import User
-from api.models import Player
+from api.models import Player, PerformanceTotals
 from api.serializers.match_performance_serializers import MatchPerformanceSerializer
 from api.serializers.serializers import PlayerSerializer, PlayerFullSerializer, MatchSerializer, MatchFullSerializer
-from api.tests.factories import UserFactory, PlayerFactory, MatchFactory, MatchPerformanceFactory
+from api.services.performance_totals import rebuild_totals
+from api.services.stats_cache import get_counters
+from api.tests.factories import PlayerFactory, MatchFactory, MatchPerformanceFactory, TeamFactory
+from api.tests.base import TokenAPITestCase
 
 
-class TestMatchPerformanceViewset(APITestCase):
+class TestMatchPerformanceViewset(TokenAPITestCase):
     def setUp(self):
         self.performances = MatchPerformanceFactory.create_batch(size=10)
 
@@ -20,9 +29,194 @@ class TestMatchPerformanceViewset(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertListEqual(response.data, expected_response)
 
+    def test_list_performances_query_count(self):
+        MatchPerformanceFactory.create_batch(size=20)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/match-performances/', format='json')
+        self.assertEqual(len(response.data), 30)
+
+    def test_list_performances_with_cursor(self):
+        ids = []
+        url = '/api/match-performances/?page_size=4'
+        while url:
+            response = self.client.get(url, format='json')
+            ids += [performance['id'] for performance in response.data['results']]
+            url = response.data['next']
+        expected = sorted(self.performances, key=lambda performance: (performance.match.time, performance.id),
+                          reverse=True)
+        self.assertListEqual(ids, [performance.id for performance in expected])
+
     def test_retrieve_match_performance(self):
         response = self.client.get('/api/match-performances/' + str(self.performances[0].id) + '/', format='json')
         expected_response = MatchPerformanceSerializer(self.performances[0]).data
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data, expected_response)
 
+    def test_get_avg_player_performance(self):
+        player = PlayerFactory()
+        performances = MatchPerformanceFactory.create_batch(size=3, player=player, set4_position=None,
+                                                            set5_position=None)
+        rebuild_totals()
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/match-performances/get_avg_player_performance/?player=' + str(player.id),
+                                       format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['set_amount'], 9)
+        self.assertEqual(response.data['results']['dig'], round(sum(p.dig for p in performances) / 9, 2))
+
+    def test_get_avg_player_performance_with_amount(self):
+        player = PlayerFactory()
+        latest = MatchPerformanceFactory(player=player, match=MatchFactory(time=timezone.now()))
+        MatchPerformanceFactory(player=player, match=MatchFactory(time=timezone.now() - timedelta(days=7)))
+        response = self.client.get('/api/match-performances/get_avg_player_performance/?amount=1&player=' +
+                                   str(player.id), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['set_amount'], 5)
+        self.assertEqual(response.data['results']['serve'], round(latest.serve / 5, 2))
+
+    def test_get_avg_team_performance(self):
+        team = self.performances[0].team
+        rebuild_totals()
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/match-performances/get_avg_team_performance/?team=' + str(team.id),
+                                       format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results']['spike'], self.performances[0].spike)
+
+    def test_create_updates_performance_totals(self):
+        rebuild_totals()
+        self.authenticate()
+        player, match, team = PlayerFactory(), MatchFactory(), TeamFactory()
+        data = {'player': player.id, 'match': match.id, 'team': team.id, 'set1_position': 1, 'spike': 4, 'dig': 2}
+
+        self.client.post('/api/match-performances/', [data], format='json')
+        self.client.post('/api/match-performances/', [dict(data, spike=3)], format='json')
+
+        player_totals = PerformanceTotals.objects.get(player=player, team=None)
+        self.assertEqual((player_totals.performances, player_totals.sets_played, player_totals.spike), (1, 1, 3))
+        self.assertEqual(PerformanceTotals.objects.get(player=player, team=team).dig, 2)
+        self.assertEqual(PerformanceTotals.objects.get(player=None, team=team).spike, 3)
+
+        performance_id = player.matchperformance_set.get().id
+        self.client.delete('/api/match-performances/' + str(performance_id) + '/', format='json')
+        self.assertEqual(PerformanceTotals.objects.get(player=None, team=team).spike, 0)
+        call_command('rebuild_performance_totals', '--check', stdout=StringIO())
+
+    def test_create_performance_sheet(self):
+        self.authenticate()
+        match, team = MatchFactory(), TeamFactory()
+        existing = MatchPerformanceFactory(match=match, team=team, spike=1)
+        players = [existing.player] + PlayerFactory.create_batch(size=11)
+        data = [{'player': player.id, 'match': match.id, 'team': team.id, 'set1_position': 1, 'spike': 5}
+                for player in players]
+
+        with self.assertNumQueries(19):
+            response = self.client.post('/api/match-performances/', data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(match.matchperformance_set.filter(spike=5).count(), 12)
+        self.assertEqual(existing.player.playerrecords.spike_match, match)
+
+    def test_create_performance_sheet_is_atomic(self):
+        self.authenticate()
+        match, team = MatchFactory(), TeamFactory()
+        data = [{'player': PlayerFactory().id, 'match': match.id, 'team': team.id},
+                {'player': 0, 'match': match.id, 'team': team.id}]
+
+        response = self.client.post('/api/match-performances/', data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(match.matchperformance_set.exists())
+
+    def test_player_records_follow_corrections(self):
+        self.authenticate()
+        player, team = PlayerFactory(), TeamFactory()
+        first, second = MatchFactory(time=timezone.now() - timedelta(days=7)), MatchFactory()
+        self.client.post('/api/match-performances/', [
+            {'player': player.id, 'match': first.id, 'team': team.id, 'dig': 9},
+            {'player': player.id, 'match': second.id, 'team': team.id, 'dig': 4}], format='json')
+
+        self.client.post('/api/match-performances/', [{'player': player.id, 'match': first.id, 'team': team.id,
+                                                       'dig': 2}], format='json')
+        player.playerrecords.refresh_from_db()
+        self.assertEqual((player.playerrecords.dig, player.playerrecords.dig_match), (4, second))
+
+        performance_id = player.matchperformance_set.get(match=second).id
+        self.client.delete('/api/match-performances/' + str(performance_id) + '/', format='json')
+        player.playerrecords.refresh_from_db()
+        self.assertEqual((player.playerrecords.dig, player.playerrecords.dig_match), (2, first))
+
+    def test_cached_stats_follow_writes(self):
+        performance = self.performances[0]
+        team_url = '/api/match-performances/get_avg_team_performance/?team=' + str(performance.team.id)
+        records_url = '/api/player-records/?player=' + str(performance.player.id)
+        rebuild_totals()
+        self.client.get(team_url, format='json')
+        self.client.get(records_url, format='json')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(team_url, format='json').data['results']['spike'], performance.spike)
+            self.assertEqual(self.client.get(records_url, format='json').data, [])
+        self.assertEqual(get_counters(), (2, 2))
+
+        self.authenticate()
+        self.client.post('/api/match-performances/', [{'player': performance.player.id, 'match': MatchFactory().id,
+                                                       'team': performance.team.id, 'spike': 40}], format='json')
+        self.assertEqual(self.client.get(team_url, format='json').data['results']['spike'],
+                         (performance.spike + 40) / 2)
+        self.assertEqual(self.client.get(records_url, format='json').data[0]['spike']['amount'], 40)
+
+    def test_performance_timeseries(self):
+        player = PlayerFactory()
+        start = timezone.now().replace(day=1, hour=12) - timedelta(days=62)
+        # two sets a match, spikes 2, 4, 6, 8 a set
+        for i, spike in enumerate((4, 8, 12, 16)):
+            MatchPerformanceFactory(player=player, match=MatchFactory(time=start + timedelta(days=i * 20)), spike=spike,
+                                    set1_position=1, set2_position=1, set3_position=None, set4_position=None,
+                                    set5_position=None)
+        url = f'/api/match-performances/timeseries/?player={player.id}&stat=spike'
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url + '&window=2', format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertListEqual([point['value'] for point in results], [2, 4, 6, 8])
+        self.assertListEqual([point['rolling_average'] for point in results], [2, 3, 5, 7])
+        self.assertEqual(results[0]['match'], player.matchperformance_set.order_by('match__time')[0].match_id)
+
+        results = self.client.get(url + '&window=2&points=2', format='json').data['results']
+        self.assertListEqual([point['rolling_average'] for point in results], [2, 7])
+
+        results = self.client.get(url + '&bucket=month&window=3', format='json').data['results']
+        self.assertEqual(sum(point['sets'] for point in results), 8)
+        self.assertEqual(results[-1]['rolling_average'], 5)
+        self.assertEqual(results[0]['time'], start.replace(day=1, hour=0, minute=0, second=0, microsecond=0))
+
+        for query in ('stat=spike', f'player={player.id}&stat=height', f'player={player.id}&window=0',
+                      f'player={player.id}&bucket=year', f'player={player.id}&points=x'):
+            response = self.client.get('/api/match-performances/timeseries/?' + query, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_performances(self):
+        performance = self.performances[0]
+        url = f'/api/match-performances/export/?player={performance.player.id}'
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, format='json')
+            lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(len(lines), 2)
+        row = next(csv.DictReader(lines))
+        self.assertEqual((row['match'], row['team'], row['spike']),
+                         (str(performance.match.id), performance.team.name, str(performance.spike)))
+
+        response = self.client.get(f'/api/match-performances/export/?team={performance.team.id}&output=ndjson',
+                                   format='json')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [performance.id])
+        day = performance.match.time.date()
+        response = self.client.get(f'/api/match-performances/export/?from={day + timedelta(days=1)}&output=ndjson',
+                                   format='json')
+        self.assertEqual(b''.join(response.streaming_content), b'')
+        for query in ('output=xml', 'from=yesterday', 'team=a'):
+            response = self.client.get('/api/match-performances/export/?' + query, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
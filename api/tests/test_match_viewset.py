@@ -1,14 +1,31 @@
+from datetime import timedelta
+from io import StringIO
 from operator import attrgetter
+from unittest import mock, skipIf
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
-from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth.models import User
-from api.models import Player
+from api.models import Player, Team
+from api.services import ratings
 from api.serializers.serializers import PlayerSerializer, PlayerFullSerializer, MatchSerializer, MatchFullSerializer
-from api.tests.factories import UserFactory, PlayerFactory, MatchFactory
+from api.tests.factories import UserFactory, PlayerFactory, MatchFactory, UserProfileFactory, UserFriendshipFactory, \
+    PlayerMembershipFactory, MatchPerformanceFactory, TeamFactory
+from api.tests.base import TokenAPITestCase
+
+
+def scores(team1, team2):
+    # every set of the match ends with the same score
+    return {**{f'set{i}_team1_score': team1 for i in range(1, 6)},
+            **{f'set{i}_team2_score': team2 for i in range(1, 6)}}
 
 
-class TestMatchViewset(APITestCase):
+class TestMatchViewset(TokenAPITestCase):
     def setUp(self):
         self.matches = MatchFactory.create_batch(size=10)
 
@@ -21,9 +38,251 @@ class TestMatchViewset(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertListEqual(response.data, expected_response)
 
+    def test_list_matches_query_count(self):
+        MatchFactory.create_batch(size=20)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/matches/', format='json')
+        self.assertEqual(len(response.data), 30)
+
+    def test_list_matches_not_modified(self):
+        url = '/api/matches/?amount=5'
+        etag = self.client.get(url, format='json')['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # renaming a team changes the embedded names
+        team = max(self.matches, key=lambda match: match.time).team1
+        team.name = 'Renamed'
+        team.save()
+        response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(self.client.get('/api/matches/?amount=4', format='json')['ETag'], response['ETag'])
+
+    def test_list_matches_with_cursor(self):
+        now = timezone.now()
+        for match in self.matches[:4]:
+            match.time = now
+            match.save()
+        ids = []
+        url = '/api/matches/?page_size=3'
+        while url:
+            with self.assertNumQueries(2):
+                response = self.client.get(url, format='json')
+            ids += [match['id'] for match in response.data['results']]
+            url = response.data['next']
+        expected = sorted(self.matches, key=lambda match: (match.time, match.id), reverse=True)
+        self.assertListEqual(ids, [match.id for match in expected])
+
+    def test_list_matches_with_cursor_on_ties(self):
+        # every match at the same time, pages continue from (time, id) and never read past an offset
+        now = timezone.now()
+        for match in self.matches:
+            match.time = now
+            match.save()
+        pages, url = [], '/api/matches/?page_size=3'
+        while url:
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url, format='json')
+            self.assertFalse([query for query in context.captured_queries if 'OFFSET' in query['sql']])
+            pages.append([match['id'] for match in response.data['results']])
+            url = response.data['next']
+        self.assertListEqual(sum(pages, []), sorted((match.id for match in self.matches), reverse=True))
+
+        response = self.client.get(self.client.get('/api/matches/?page_size=3', format='json').data['next'],
+                                   format='json')
+        response = self.client.get(response.data['previous'], format='json')
+        self.assertListEqual([match['id'] for match in response.data['results']], pages[0])
+
+    def test_list_matches_with_cursor_and_order(self):
+        ids, url = [], '/api/matches/?order=desc&page_size=4'
+        while url:
+            response = self.client.get(url, format='json')
+            ids += [match['id'] for match in response.data['results']]
+            url = response.data['next']
+        self.assertListEqual(ids, sorted((match.id for match in self.matches), reverse=True))
+        self.assertEqual(self.client.get('/api/matches/?cursor=cD1bMV0%3D', format='json').status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+    def test_list_matches_with_invalid_cursor_values(self):
+        # p=["abc","x"], an id out of range and a list where a time belongs
+        for cursor in ('cD1bImFiYyIsIngiXQ%3D%3D',
+                       'cD1bIjIwMjQtMDEtMDFUMDA6MDA6MDArMDA6MDAiLCI5OTk5OTk5OTk5OTk5OTk5OTk5OTk5OSJd',
+                       'cD1bWyJhIl0sMV0%3D'):
+            response = self.client.get('/api/matches/?cursor=' + cursor, format='json')
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_retrieve_match(self):
         response = self.client.get('/api/matches/' + str(self.matches[0].id) + '/', format='json')
         expected_response = MatchFullSerializer(self.matches[0]).data
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data, expected_response)
 
+    def test_match_result_is_stored(self):
+        match = MatchFactory(set1_team1_score=25, set1_team2_score=20, set2_team1_score=18, set2_team2_score=25,
+                             set3_team1_score=25, set3_team2_score=23, set4_team1_score=None, set4_team2_score=None,
+                             set5_team1_score=0, set5_team2_score=0)
+        # a match entered halfway has no winner yet
+        self.assertEqual((match.team1_sets, match.team2_sets, match.winner, match.total_points),
+                         (2, 1, None, 136))
+
+        match.set4_team1_score, match.set4_team2_score = 25, 20
+        match.save()
+        self.assertEqual((match.team1_sets, match.team2_sets, match.winner), (3, 1, match.team1))
+
+        match.set3_team2_score, match.set4_team1_score, match.set4_team2_score = 27, 20, 25
+        match.save(update_fields=['set3_team2_score', 'set4_team1_score', 'set4_team2_score'])
+        match.refresh_from_db()
+        self.assertEqual((match.team1_sets, match.team2_sets, match.winner), (1, 3, match.team2))
+
+    def test_list_matches_by_result(self):
+        team = self.matches[0].team1
+        won = MatchFactory(team2=team, **scores(20, 25))
+        lost = MatchFactory(team1=team, **scores(20, 25))
+        MatchFactory(team1=team, **scores(0, 0))
+        expected = {match.id: match for match in (self.matches[0], won, lost)}
+
+        for result in ('won', 'lost'):
+            with self.assertNumQueries(2):
+                response = self.client.get(f'/api/matches/?team={team.id}&result={result}', format='json')
+            ids = [match['id'] for match in response.data]
+            self.assertTrue(all((expected[match_id].winner == team) == (result == 'won') for match_id in ids))
+        self.assertIn(won.id, [match['id'] for match in self.client.get(
+            f'/api/matches/?team={team.id}&result=won', format='json').data])
+        self.assertIn(lost.id, [match['id'] for match in self.client.get(
+            f'/api/matches/?team={team.id}&result=lost', format='json').data])
+
+        membership = PlayerMembershipFactory(team=team)
+        response = self.client.get(f'/api/matches/?player={membership.player.id}&result=won', format='json')
+        self.assertIn(won.id, [match['id'] for match in response.data])
+
+        response = self.client.get('/api/matches/?result=won', format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_get_user_friends_matches(self):
+        user = UserProfileFactory().user
+        now = timezone.now()
+        expected_matches = {}
+        for _ in range(3):
+            friend = UserProfileFactory()
+            UserFriendshipFactory(user1=user, user2=friend.user)
+            membership = PlayerMembershipFactory(player=friend.player, date_left=None)
+            left_membership = PlayerMembershipFactory(player=friend.player)
+            MatchFactory(team1=left_membership.team, time=now + timedelta(days=1))
+            MatchFactory(team2=membership.team, time=now + timedelta(days=5))
+            expected_matches[friend.player.id] = MatchFactory(team2=membership.team, time=now + timedelta(days=2)).id
+
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/matches/get_user_friends_matches/?user=' + str(user.id), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({item['player']['id']: item['match']['id'] for item in response.data}, expected_matches)
+
+    def test_team_head_to_head(self):
+        team_a, team_b = self.matches[0].team1, self.matches[0].team2
+        past = timezone.now() - timedelta(days=1)
+        won = MatchFactory(team1=team_b, team2=team_a, time=past, **scores(20, 25))
+        lost = MatchFactory(team1=team_a, team2=team_b, time=past, **scores(20, 25))
+        self.matches[0].delete()
+        MatchFactory(team1=team_a)
+        MatchPerformanceFactory(match=won, team=team_a, spike=4)
+        MatchPerformanceFactory(match=lost, team=team_a, spike=6)
+        MatchPerformanceFactory(match=lost, team=team_b, spike=1)
+        url = f'/api/matches/head_to_head/?team_a={team_a.id}&team_b={team_b.id}'
+
+        with self.assertNumQueries(3):
+            response = self.client.get(url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({match['id'] for match in response.data['matches']}, {won.id, lost.id})
+        side_a, side_b = response.data['side_a'], response.data['side_b']
+        self.assertEqual((side_a['team']['id'], side_a['wins'], side_a['losses']), (team_a.id, 1, 1))
+        self.assertEqual((side_a['totals']['performances'], side_a['totals']['spike']), (2, 10))
+        self.assertEqual(side_b['totals']['spike'], 1)
+        with self.assertNumQueries(1):
+            self.client.get(url, format='json')
+
+        # a scheduled match keeps the head to head out of the cache
+        self.authenticate(team_a.owner)
+        upcoming = self.client.post('/api/matches/', {'team1': team_a.name, 'team2': team_b.name,
+                                                      'time': timezone.now() + timedelta(days=1)}, format='json')
+        response = self.client.get(url, format='json')
+        self.assertEqual((response.data['unfinished'], len(response.data['matches'])), (1, 3))
+        self.client.patch(f'/api/matches/{upcoming.data["id"]}/', {'time': past, **scores(25, 10)}, format='json')
+        response = self.client.get(url, format='json')
+        self.assertEqual((response.data['unfinished'], response.data['side_a']['wins']), (0, 2))
+
+    def test_player_head_to_head(self):
+        player_a, player_b, teammate = PlayerFactory.create_batch(size=3)
+        match = MatchFactory(time=timezone.now() - timedelta(days=1), **scores(25, 20))
+        MatchPerformanceFactory(match=match, player=player_a, team=match.team1, dig=3)
+        MatchPerformanceFactory(match=match, player=player_b, team=match.team2, dig=5)
+        MatchPerformanceFactory(match=match, player=teammate, team=match.team1)
+        shared = MatchFactory()
+        MatchPerformanceFactory(match=shared, player=player_a, team=shared.team1)
+        MatchPerformanceFactory(match=shared, player=player_b, team=shared.team1)
+
+        response = self.client.get(f'/api/matches/head_to_head/?player_a={player_a.id}&player_b={player_b.id}',
+                                   format='json')
+        self.assertEqual([match['id'] for match in response.data['matches']], [match.id])
+        self.assertEqual((response.data['side_a']['wins'], response.data['side_b']['losses']), (1, 1))
+        self.assertEqual(response.data['side_b']['totals']['dig'], 5)
+
+        response = self.client.get(f'/api/matches/head_to_head/?player_a={player_a.id}&player_b={teammate.id}',
+                                   format='json')
+        self.assertEqual(response.data['matches'], [])
+        for query in (f'team_a={match.team1.id}', f'team_a={match.team1.id}&team_b={match.team1.id}',
+                      f'player_a={player_a.id}&player_b=0'):
+            response = self.client.get('/api/matches/head_to_head/?' + query, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_match_ratings(self):
+        team_a, team_b = self.matches[0].team1, self.matches[0].team2
+        player_a, player_b = PlayerFactory.create_batch(size=2)
+        first, second = (MatchFactory(team1=team_a, team2=team_b, time=timezone.now() - timedelta(days=days),
+                                      **scores(0, 0)) for days in (2, 1))
+        self.authenticate(team_a.owner)
+        self.client.post('/api/match-performances/', [
+            {'player': player.id, 'match': match.id, 'team': team.id}
+            for match in (first, second) for player, team in ((player_a, team_a), (player_b, team_b))], format='json')
+
+        self.client.patch(f'/api/matches/{first.id}/', scores(25, 20), format='json')
+        response = self.client.get(f'/api/players/{player_a.id}/', format='json')
+        self.assertEqual(response.data['rating'], 1516)
+        team_a.refresh_from_db()
+        self.assertEqual(team_a.rating, 1516)
+
+        self.client.patch(f'/api/matches/{second.id}/', scores(20, 25), format='json')
+        rated = {team.id: team.rating for team in Team.objects.filter(id__in=(team_a.id, team_b.id))}
+        self.assertAlmostEqual(rated[team_b.id], 1484 + 32 * (1 - ratings.expected_score(1484, 1516)))
+        self.assertAlmostEqual(sum(rated.values()), 3000)
+        # patching the time alone keeps the result and the rating
+        self.client.patch(f'/api/matches/{second.id}/', {'time': timezone.now() - timedelta(hours=1)}, format='json')
+        self.assertEqual(Team.objects.get(id=team_b.id).rating, rated[team_b.id])
+
+        self.client.delete(f'/api/matches/{second.id}/', format='json')
+        self.assertEqual(Team.objects.get(id=team_b.id).rating, 1484)
+        self.assertEqual(Player.objects.get(id=player_b.id).rating, 1484)
+
+    @skipIf(ratings.np is None, 'numpy is not installed')
+    def test_recompute_ratings(self):
+        team_a, team_b = TeamFactory.create_batch(size=2)
+        player = PlayerFactory()
+        self.authenticate(team_a.owner)
+        for days, result in ((3, (25, 20)), (2, (20, 25)), (1, (25, 20))):
+            match = MatchFactory(team1=team_a, team2=team_b, time=timezone.now() - timedelta(days=days),
+                                 **scores(0, 0))
+            self.client.post('/api/match-performances/', [{'player': player.id, 'match': match.id,
+                                                           'team': team_b.id}], format='json')
+            self.client.patch(f'/api/matches/{match.id}/', scores(*result), format='json')
+        incremental = {team.id: team.rating for team in Team.objects.all()}
+        player_rating = Player.objects.get(id=player.id).rating
+
+        call_command('recompute_ratings', stdout=StringIO())
+        # the factory matches are rated too, the two teams only played each other
+        for team in Team.objects.filter(id__in=(team_a.id, team_b.id)):
+            self.assertAlmostEqual(team.rating, incremental[team.id])
+        self.assertAlmostEqual(Player.objects.get(id=player.id).rating, player_rating)
+        self.assertAlmostEqual(sum(Team.objects.values_list('rating', flat=True)), 1500 * Team.objects.count())
+
+        with mock.patch.object(ratings, 'np', None), self.assertRaises(CommandError):
+            call_command('recompute_ratings', stdout=StringIO())
@@ -0,0 +1,35 @@
+from rest_framework.test import APITestCase
+from rest_framework import status
+from api.serializers.player_records_serializers import PlayerRecordsSerializer
+from api.tests.factories import PlayerRecordsFactory
+
+
+class TestPlayerRecordsViewset(APITestCase):
+    def setUp(self):
+        self.records = PlayerRecordsFactory.create_batch(size=3)
+
+    def test_list_player_records(self):
+        response = self.client.get('/api/player-records/', format='json')
+        expected_response = [PlayerRecordsSerializer(record).data for record in self.records]
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertListEqual(response.data, expected_response)
+
+    def test_list_player_records_query_count(self):
+        PlayerRecordsFactory.create_batch(size=5)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/player-records/', format='json')
+        self.assertEqual(len(response.data), 8)
+
+    def test_filter_player_records(self):
+        record = self.records[0]
+        response = self.client.get('/api/player-records/?player=' + str(record.player.id), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['dig']['amount'], record.dig)
+        self.assertEqual(response.data[0]['dig']['match']['team1_name'], record.dig_match.team1.name)
+
+    def test_serialize_records_sharing_context(self):
+        context = {}
+        first, second = (PlayerRecordsSerializer(record, context=context).data for record in self.records[:2])
+        self.assertEqual(first['dig']['match']['id'], self.records[0].dig_match_id)
+        self.assertEqual(second['dig']['match']['id'], self.records[1].dig_match_id)
+        self.assertEqual(context, {})
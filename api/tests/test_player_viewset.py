@@ -1,12 +1,16 @@
-from rest_framework.test import APITestCase
+from io import StringIO
+
+from django.core.management import call_command
 from rest_framework import status
 from django.contrib.auth.models import User
-from api.models import Player
+from api.models import Player, PerformanceTotals
 from api.serializers.serializers import PlayerSerializer, PlayerFullSerializer
-from api.tests.factories import UserFactory, PlayerFactory
+from api.services.performance_totals import rebuild_totals
+from api.tests.factories import UserFactory, PlayerFactory, UserProfileFactory, MatchPerformanceFactory
+from api.tests.base import TokenAPITestCase
 
 
-class TestPlayerViewset(APITestCase):
+class TestPlayerViewset(TokenAPITestCase):
     def setUp(self):
         self.user1 = UserFactory()
         self.user2 = UserFactory()
@@ -31,9 +35,76 @@ class TestPlayerViewset(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
 
+    def test_list_players_with_cursor(self):
+        ids = []
+        url = '/api/players/?order=desc&page_size=4'
+        while url:
+            response = self.client.get(url, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids += [player['id'] for player in response.data['results']]
+            url = response.data['next']
+        self.assertListEqual(ids, [player.id for player in reversed(self.players)])
+
     def test_retrieve_player(self):
         response = self.client.get('/api/players/' + str(self.players[0].id) + '/', format='json')
         expected_response = PlayerFullSerializer(self.players[0]).data
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data, expected_response)
 
+    def test_retrieve_player_not_modified(self):
+        url = '/api/players/' + str(self.players[0].id) + '/'
+        etag = self.client.get(url, format='json')['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        self.players[0].save()
+        response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_new_friendship_modifies_players(self):
+        profile1, profile2 = UserProfileFactory(), UserProfileFactory()
+        url = '/api/players/' + str(profile1.player.id) + '/'
+        etag = self.client.get(url, format='json')['ETag']
+        self.authenticate(profile1.user)
+        self.client.post('/api/user-friendships/', {'user1': profile1.user.id, 'user2': profile2.user.id},
+                         format='json')
+        response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data['friends']), {profile2.user.id})
+
+    def test_destroy_player_updates_performance_totals(self):
+        performance = MatchPerformanceFactory()
+        MatchPerformanceFactory(match=performance.match, team=performance.team)
+        rebuild_totals()
+        self.authenticate(self.user1)
+        response = self.client.delete('/api/players/' + str(performance.player_id) + '/', format='json')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(PerformanceTotals.objects.get(player=None, team=performance.team).performances, 1)
+        call_command('rebuild_performance_totals', '--check', stdout=StringIO())
+
+    def test_search_players(self):
+        kowalski = PlayerFactory(name='Jan', surname='Kowalski', nick='')
+        kowalczyk = PlayerFactory(name='Anna', surname='Kowalczyk', nick='')
+        nowak = PlayerFactory(name='Piotr', surname='Nowak', nick='kowal')
+
+        response = self.client.get('/api/players/search/?q=kowal', format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertSetEqual({player['id'] for player in response.data}, {kowalski.id, kowalczyk.id, nowak.id})
+
+        response = self.client.get('/api/players/search/?q=jan kowalsky&limit=1', format='json')
+        self.assertListEqual([player['id'] for player in response.data], [kowalski.id])
+
+        kowalski.surname = 'Wisniewski'
+        kowalski.save()
+        response = self.client.get('/api/players/search/?q=wisniewsk', format='json')
+        self.assertListEqual([player['id'] for player in response.data], [kowalski.id])
+
+    def test_search_players_wrong_params(self):
+        self.assertEqual(self.client.get('/api/players/search/', format='json').status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get('/api/players/search/?q=a&limit=x', format='json').status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
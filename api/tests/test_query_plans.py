@@ -0,0 +1,93 @@
+import re
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import Comment
+from api.tests.factories import MatchPerformanceFactory, PlayerFactory, PlayerMembershipFactory, \
+    PlayerRecordsFactory, UserFriendshipFactory, UserProfileFactory
+
+# a table read from end to end, plain or through an index, only SEARCH steps narrow the rows down,
+# scans of subqueries, constant rows and the fts virtual tables are fine
+FULL_SCAN = re.compile(r'\bSCAN (?!CONSTANT ROW\b|subquery\b)\w+\b(?! VIRTUAL TABLE)')
+
+
+class TestQueryPlans(APITestCase):
+    def setUp(self):
+        self.performance = MatchPerformanceFactory()
+        self.match = self.performance.match
+        self.team = self.performance.team
+        self.player = self.performance.player
+        self.profile = UserProfileFactory(player=self.player)
+        PlayerMembershipFactory(player=self.player, team=self.match.team1, date_left=None)
+        UserFriendshipFactory(user1=UserProfileFactory().user, user2=self.profile.user)
+        PlayerRecordsFactory(player=self.player)
+        Comment.objects.create(user=self.profile.user, description='Comment', object_id=self.team.id,
+                               content_type=ContentType.objects.get_for_model(self.team))
+
+    def query_plans(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                if query['sql'].startswith(('SELECT', 'WITH')):
+                    cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                    plans.append((query['sql'], [row[-1] for row in cursor.fetchall()]))
+        return plans
+
+    def assertNoFullScans(self, url):
+        for sql, plan in self.query_plans(url):
+            scans = [step for step in plan if FULL_SCAN.search(step)]
+            self.assertFalse(scans, f'{url} scans a table:\n{sql}\n' + '\n'.join(plan))
+
+    def assertUsesIndex(self, url, *indexes):
+        steps = '\n'.join(step for sql, plan in self.query_plans(url) for step in plan)
+        for index in indexes:
+            self.assertIn(f'INDEX {index} ', steps, f'{url} does not use {index}:\n{steps}')
+
+    def test_full_scan_detection(self):
+        self.assertTrue(FULL_SCAN.search('SCAN api_match'))
+        self.assertTrue(FULL_SCAN.search('SCAN api_match USING INDEX match_time_idx'))
+        self.assertFalse(FULL_SCAN.search('SEARCH api_match USING INDEX match_team1_time_idx (team1_id=?)'))
+        self.assertFalse(FULL_SCAN.search('SCAN CONSTANT ROW'))
+
+    def test_hot_queries_use_their_indexes(self):
+        self.assertUsesIndex(f'/api/matches/?team={self.team.id}&time=past', 'match_team1_time_idx',
+                             'match_team2_time_idx')
+        self.assertUsesIndex(f'/api/match-performances/?player={self.player.id}&team={self.team.id}',
+                             'performance_player_team_idx')
+        self.assertUsesIndex(f'/api/teams/{self.match.team1.id}/', 'membership_active_team_idx')
+        self.assertUsesIndex(f'/api/user-friendships/get_user_friends/?user={self.profile.user.id}',
+                             'friendship_user2_user1_idx')
+
+    def test_match_queries(self):
+        self.assertNoFullScans(f'/api/matches/?team={self.team.id}&time=past')
+        self.assertNoFullScans(f'/api/matches/?team={self.match.team1.id}&time=future')
+        self.assertNoFullScans(f'/api/matches/?player={self.player.id}')
+        self.assertNoFullScans(f'/api/matches/{self.match.id}/')
+        self.assertNoFullScans(f'/api/matches/get_user_friends_matches/?user={self.profile.user.id}')
+        self.assertNoFullScans(f'/api/matches/head_to_head/?team_a={self.match.team1.id}&team_b={self.match.team2.id}')
+        self.assertNoFullScans(f'/api/matches/head_to_head/?player_a={self.player.id}&player_b={PlayerFactory().id}')
+
+    def test_match_performance_queries(self):
+        self.assertNoFullScans(f'/api/match-performances/?player={self.player.id}&team={self.team.id}')
+        self.assertNoFullScans(f'/api/match-performances/?team={self.team.id}&page_size=10')
+        self.assertNoFullScans(f'/api/match-performances/get_avg_player_performance/?player={self.player.id}'
+                               f'&team={self.team.id}&amount=5')
+        self.assertNoFullScans(f'/api/match-performances/get_avg_team_performance/?team={self.team.id}&amount=5')
+        self.assertNoFullScans(f'/api/player-records/?player={self.player.id}')
+
+    def test_team_queries(self):
+        self.assertNoFullScans(f'/api/teams/{self.match.team1.id}/')
+        self.assertNoFullScans(f'/api/teams/?player={self.player.id}')
+        self.assertNoFullScans('/api/teams/autocomplete/?q=a')
+        self.assertNoFullScans(f'/api/comments/?content_type=team&object_id={self.team.id}')
+
+    def test_friendship_queries(self):
+        self.assertNoFullScans(f'/api/user-friendships/get_user_friends/?user={self.profile.user.id}')
+        self.assertNoFullScans(f'/api/players/{self.player.id}/')
@@ -0,0 +1,66 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.tests.factories import MatchFactory, TeamFactory
+
+
+def result(sets, time):
+    # the first team wins the sets marked 1, every set ends 25:20
+    scores = {}
+    for i in range(1, 6):
+        won = sets[i - 1] if i <= len(sets) else None
+        scores[f'set{i}_team1_score'] = 0 if won is None else (25 if won else 20)
+        scores[f'set{i}_team2_score'] = 0 if won is None else (20 if won else 25)
+    return dict(scores, time=time)
+
+
+class TestStandingsViewset(APITestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.a, self.b, self.c = TeamFactory.create_batch(size=3)
+        MatchFactory(team1=self.a, team2=self.b, **result((1, 1, 1), self.now - timedelta(days=3)))
+        self.b_c = MatchFactory(team1=self.b, team2=self.c, **result((1, 0, 1, 0, 1), self.now - timedelta(days=2)))
+        MatchFactory(team1=self.c, team2=self.a, **result((0, 1, 0, 1, 0), self.now - timedelta(days=1)))
+        # not played yet and outside the league
+        MatchFactory(team1=self.a, team2=self.b, **result((), self.now + timedelta(days=1)))
+        MatchFactory(team1=self.a, team2=TeamFactory(), **result((0, 0, 0), self.now - timedelta(days=1)))
+
+    def standings(self, query):
+        response = self.client.get('/api/standings/?' + query, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['results']
+
+    def test_standings(self):
+        with self.assertNumQueries(2):
+            rows = self.standings(f'teams={self.a.id},{self.b.id},{self.c.id}')
+        self.assertListEqual([(row['team']['id'], row['wins'], row['losses'], row['ranking_points']) for row in rows],
+                             [(self.a.id, 2, 0, 5), (self.b.id, 1, 1, 2), (self.c.id, 0, 2, 2)])
+        self.assertEqual((rows[0]['sets_won'], rows[0]['sets_lost'], rows[0]['sets_ratio']), (6, 2, 3.0))
+        self.assertEqual((rows[2]['points_won'], rows[2]['points_lost']), (220, 230))
+
+    def test_standings_in_date_range(self):
+        day = (self.now - timedelta(days=2)).date().isoformat()
+        rows = self.standings(f'teams={self.a.id},{self.b.id},{self.c.id}&from={day}&to={day}')
+        self.assertListEqual([(row['team']['id'], row['matches'], row['ranking_points']) for row in rows],
+                             [(self.b.id, 1, 2), (self.c.id, 1, 1), (self.a.id, 0, 0)])
+
+    def test_standings_follow_score_changes(self):
+        self.b_c.set5_team1_score, self.b_c.set5_team2_score = 10, 15
+        self.b_c.save()
+        rows = self.standings(f'teams={self.b.id},{self.c.id}')
+        self.assertListEqual([(row['team']['id'], row['ranking_points']) for row in rows],
+                             [(self.c.id, 2), (self.b.id, 1)])
+
+    def test_standings_skip_unfinished_matches(self):
+        MatchFactory(team1=self.b, team2=self.c, **result((1, 0, 1), self.now - timedelta(hours=1)))
+        rows = self.standings(f'teams={self.b.id},{self.c.id}')
+        self.assertListEqual([(row['team']['id'], row['matches'], row['ranking_points']) for row in rows],
+                             [(self.b.id, 1, 2), (self.c.id, 1, 1)])
+
+    def test_wrong_params(self):
+        for query in ('teams=a,b', 'from=yesterday'):
+            response = self.client.get('/api/standings/?' + query, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
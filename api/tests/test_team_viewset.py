@@ -1,18 +1,20 @@
 import json
+from django.contrib.contenttypes.models import ContentType
 from json import loads
 from rest_framework import status
-from rest_framework.test import APITestCase
-from rest_framework.authtoken.models import Token
-from api.tests.factories import TeamFactory, UserFactory
+from api.models import Team
+from api.tests.factories import TeamFactory, UserFactory, PlayerMembershipFactory, PlayerRecordsFactory
+from api.tests.base import TokenAPITestCase
 
 
-class TestTeamViewset(APITestCase):
+class TestTeamViewset(TokenAPITestCase):
     def test_successful_request(self):
         teams = TeamFactory.create_batch(size=5)
         expected_response = [{
             'id': team.id,
             'name': team.name,
             'description': team.description,
+            'rating': 1500.0,
             'owner': team.owner.id
         } for team in teams
         ]
@@ -29,9 +31,59 @@ class TestTeamViewset(APITestCase):
 
     def test_delete_not_owned_team(self):
         team = TeamFactory()
-        user = UserFactory(username='testuser', password='testpassword')
-        token = Token.objects.create(user=user)
-        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.authenticate(UserFactory(username='testuser', password='testpassword'))
         response = self.client.delete('/api/teams/' + str(team.id) + '/', format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(response.data['message'], 'You are not owner of the team')
+
+    def test_rename_team_refreshes_cached_records(self):
+        record = PlayerRecordsFactory()
+        team = record.dig_match.team1
+        url = '/api/player-records/?player=' + str(record.player.id)
+        self.assertEqual(self.client.get(url, format='json').data[0]['dig']['match']['team1_name'], team.name)
+        self.authenticate(team.owner)
+        response = self.client.patch('/api/teams/' + str(team.id) + '/', {'name': 'Renamed team'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(url, format='json').data[0]['dig']['match']['team1_name'], 'Renamed team')
+
+    def test_retrieve_team_active_players(self):
+        team = TeamFactory()
+        active = PlayerMembershipFactory.create_batch(size=6, team=team, date_left=None)
+        PlayerMembershipFactory.create_batch(size=2, team=team)
+        ContentType.objects.get_for_model(Team)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/teams/' + str(team.id) + '/', format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertListEqual([player['id'] for player in response.data['players']],
+                             [membership.player.id for membership in active])
+
+    def test_list_player_teams(self):
+        first = PlayerMembershipFactory()
+        memberships = [first] + PlayerMembershipFactory.create_batch(size=4, player=first.player)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/teams/?player=' + str(first.player.id), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # the teams come unordered, so they are matched by id
+        self.assertDictEqual({team['id']: team['date_left'] for team in response.data},
+                             {membership.team.id: membership.date_left.isoformat() for membership in memberships})
+
+    def test_autocomplete_team_names(self):
+        owner = UserFactory()
+        volley = TeamFactory(name='Volley Team', owner=owner)
+        vikings = TeamFactory(name='vikings', owner=owner)
+        TeamFactory(name='Volleyball Club')
+        TeamFactory(name='Old Volley')
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/teams/autocomplete/?q=VOLLEY', format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertListEqual([team['name'] for team in response.data], ['Volley Team', 'Volleyball Club'])
+
+        response = self.client.get('/api/teams/autocomplete/?q=v&limit=5&owner=' + str(owner.id), format='json')
+        self.assertListEqual(response.data, [{'id': vikings.id, 'name': 'vikings'},
+                                             {'id': volley.id, 'name': 'Volley Team'}])
+
+        volley.name = 'Alpha'
+        volley.save(update_fields=['name'])
+        response = self.client.get('/api/teams/autocomplete/?q=al&owner=' + str(owner.id), format='json')
+        self.assertListEqual([team['id'] for team in response.data], [volley.id])
@@ -1,6 +1,6 @@
 from django.urls import re_path
 
-from api.views import views, performance_views, team_views, match_views
+from api.views import views, performance_views, team_views, match_views, leaderboard_views, standings_views
 from rest_framework import routers
 from django.conf.urls import include
 
@@ -16,6 +16,8 @@ router.register(r'matches', match_views.MatchViewset, basename='Match')
 router.register(r'player-records', views.PlayerRecordsViewset)
 router.register(r'user-friendships', views.UserFriendshipViewset)
 router.register(r'user-friendship-invitations', views.UserFriendshipInvitationViewset)
+router.register(r'leaderboards', leaderboard_views.LeaderboardViewset, basename='Leaderboard')
+router.register(r'standings', standings_views.StandingsViewset, basename='Standings')
 
 urlpatterns = [
     re_path(r'^', include(router.urls)),
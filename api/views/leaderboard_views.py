@@ -0,0 +1,47 @@
+from rest_framework import viewsets, status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.response import Response
+
+from api.models import Player
+from api.serializers.serializers import PlayerSerializer
+from api.services.leaderboards import LeaderboardError, rank_players
+from api.services.stats_cache import cached_leaderboard
+
+MAX_LIMIT = 100
+
+
+class LeaderboardViewset(viewsets.ViewSet):
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticatedOrReadOnly,)
+
+    def list(self, request):
+        params = self.request.query_params
+        try:
+            options = {
+                'stat': params.get('stat', 'total_score'),
+                'per': params.get('per', 'total'),
+                'scope': params.get('scope', 'all'),
+                'season': int(params['season']) if 'season' in params else None,
+                'team_id': int(params['team']) if 'team' in params else None,
+                'position': params.get('position'),
+                'limit': min(int(params.get('limit', 10)), MAX_LIMIT),
+                'min_sets': int(params.get('min_sets', 0)),
+                'min_matches': int(params.get('min_matches', 0)),
+                'min_attempts': int(params.get('min_attempts', 0)),
+            }
+        except ValueError:
+            return Response({'message': 'Wrong params'}, status=status.HTTP_400_BAD_REQUEST)
+        if options['limit'] < 1:
+            return Response({'message': 'Wrong params'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            ranking = cached_leaderboard(options, lambda: rank_players(**options))
+        except LeaderboardError as e:
+            return Response({'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # players are loaded on every request, so renames show up in cached rankings
+        players = Player.objects.in_bulk([row['player'] for row in ranking])
+        results = [dict(row, player=PlayerSerializer(players[row['player']]).data)
+                   for row in ranking if row['player'] in players]
+        return Response({'message': 'Successfully calculated', 'results': results}, status=status.HTTP_200_OK)
@@ -1,5 +1,6 @@
-from datetime import datetime
+from copy import copy
 
+from django.db import transaction
 from django.db.models import Q
 from django.utils import timezone
 from rest_framework import viewsets, status
@@ -8,26 +9,50 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated, AllowAny
 from rest_framework.response import Response
 
-from api.models import Match, Team, UserFriendship, Player
-from api.serializers.serializers import MatchSerializer, MatchFullSerializer, PlayerSerializer
+from api.models import Match, Team, UserFriendship, Player, MatchPerformance
+from api.pagination import MatchPagination
+from api.serializers.serializers import MatchSerializer, MatchFullSerializer, PlayerSerializer, TeamSerializer
+from api.services.friends_matches import nearest_matches
+from api.services.head_to_head import player_head_to_head, team_head_to_head
+from api.services.performance_totals import apply_performance_changes
+from api.services.player_records import recompute_player_records
+from api.services.ratings import unrate_matches, update_match_rating
+from api.services.stats_cache import cached_head_to_head, invalidate_stats
+from api.views.mixins import ConditionalGetMixin, ExportMixin
 from django.contrib.auth.models import User
 
 
-class MatchViewset(viewsets.ModelViewSet):
+class MatchViewset(ConditionalGetMixin, ExportMixin, viewsets.ModelViewSet):
     serializer_class = MatchSerializer
     authentication_classes = (TokenAuthentication,)
     permission_classes = (IsAuthenticatedOrReadOnly,)
+    pagination_class = MatchPagination
+    version_fields = ('updated_at', 'team1__updated_at', 'team2__updated_at')
+    export_kind = 'matches'
+    RESULTS = ('won', 'lost')
+
+    def list(self, request, *args, **kwargs):
+        params = self.request.query_params
+        if 'result' in params and (params['result'] not in self.RESULTS or not ('team' in params or 'player' in params)):
+            return Response({'message': 'Result filter needs won or lost and a team or player'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return super().list(request, *args, **kwargs)
 
     def retrieve(self, request, *args, **kwargs):
-        instance = Match.objects.get(pk=kwargs['pk'])
-        serializer = MatchFullSerializer(instance, many=False, context={'request': request})
-        return Response(serializer.data)
+        instance = Match.objects.select_related('team1', 'team2').get(pk=kwargs['pk'])
+
+        def build_response():
+            serializer = MatchFullSerializer(instance, many=False, context={'request': request})
+            return Response(serializer.data)
+        return self.conditional_detail(request, instance, build_response)
 
     def get_queryset(self):
-        queryset = Match.objects.all().order_by('-time')
+        queryset = Match.objects.select_related('team1', 'team2').order_by('-time')
 
+        team_ids = None
         team_id = self.request.query_params.get('team')
         if team_id is not None:
+            team_ids = [team_id]
             queryset = queryset.filter(Q(team1=team_id) | Q(team2=team_id))
 
         player_id = self.request.query_params.get('player')
@@ -35,6 +60,11 @@ class MatchViewset(viewsets.ModelViewSet):
             team_ids = Team.objects.filter(players__id=player_id).values_list('id', flat=True)
             queryset = queryset.filter(Q(team1__in=team_ids) | Q(team2__in=team_ids))
 
+        result = self.request.query_params.get('result')
+        if result in self.RESULTS and team_ids is not None:
+            won = Q(winner__in=team_ids)
+            queryset = queryset.filter(won if result == 'won' else Q(winner__isnull=False) & ~won)
+
         time = self.request.query_params.get('time')
         if time is not None:
             actual_time = timezone.now()
@@ -48,7 +78,7 @@ class MatchViewset(viewsets.ModelViewSet):
             queryset = queryset.order_by('-id')
 
         match_amount = int(self.request.query_params.get('amount', 0))
-        if match_amount:
+        if match_amount and not self.paginator.is_requested(self.request):
             queryset = queryset[:match_amount]
         return queryset
 
@@ -68,7 +98,7 @@ class MatchViewset(viewsets.ModelViewSet):
     @action(methods=['GET'], detail=False)
     def get_user_friends_matches(self, request):
         try:
-            user = User.objects.get(id=self.request.query_params.get('user'))
+            user = User.objects.select_related('profile').get(id=self.request.query_params.get('user'))
             friendships = UserFriendship.objects.filter(
                 Q(user1=user.id) | Q(user2=user.id)
             ).select_related('user1__profile__player', 'user2__profile__player')
@@ -76,28 +106,25 @@ class MatchViewset(viewsets.ModelViewSet):
                       {f.user2.profile.player_id: f.user2.profile.player for f in friendships}
             friends.pop(user.profile.player_id)
 
-            now = datetime.now(timezone.utc)
-            if self.request.query_params.get('time') == 'past':
+            now = timezone.now()
+            past = self.request.query_params.get('time') == 'past'
+            friends_match_ids = nearest_matches(friends.keys(), now, past=past)
+            matches = Match.objects.select_related('team1', 'team2').in_bulk(friends_match_ids.values())
+            if past:
                 friends_matches = [
                     {
-                        'match': MatchSerializer(Match.objects.filter(
-                            Q(team1__players=friend) | Q(team2__players=friend),
-                            time__lte=now,
-                        ).order_by('-time').first()).data,
+                        'match': MatchSerializer(matches.get(friends_match_ids.get(friend_id))).data,
                         'player': PlayerSerializer(friend).data
-                    } for friend in friends.values()
+                    } for friend_id, friend in friends.items()
                 ]
             else:
                 friends_matches = [
                     {
-                        'match': MatchSerializer(match).data,
+                        'match': MatchSerializer(matches[friends_match_ids[friend_id]]).data,
                         'player': PlayerSerializer(friend).data
                     }
-                    for friend in friends.values()
-                    if (match := Match.objects.filter(
-                        Q(team1__players=friend) | Q(team2__players=friend),
-                        time__gte=now,
-                    ).order_by('time').first())
+                    for friend_id, friend in friends.items()
+                    if friend_id in friends_match_ids
                 ]
 
             return Response(friends_matches, status=status.HTTP_200_OK)
@@ -107,12 +134,48 @@ class MatchViewset(viewsets.ModelViewSet):
             return Response({'message': 'User has no friends'}, status=status.HTTP_200_OK)
 
 
+    @action(methods=['GET'], detail=False)
+    def head_to_head(self, request):
+        params = self.request.query_params
+        if 'team_a' in params and 'team_b' in params:
+            kind, model, serializer_class, compute = 'team', Team, TeamSerializer, team_head_to_head
+        elif 'player_a' in params and 'player_b' in params:
+            kind, model, serializer_class, compute = 'player', Player, PlayerSerializer, player_head_to_head
+        else:
+            return Response({'message': 'Provide team_a and team_b or player_a and player_b params'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            side_a, side_b = int(params[f'{kind}_a']), int(params[f'{kind}_b'])
+        except ValueError:
+            return Response({'message': 'Wrong params'}, status=status.HTTP_400_BAD_REQUEST)
+        sides = model.objects.in_bulk([side_a, side_b])
+        if side_a == side_b or len(sides) < 2:
+            return Response({'message': 'Wrong params'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # finished head to heads only change with corrections, which bump the versions of both sides
+        result = cached_head_to_head(kind, side_a, side_b, lambda: compute(side_a, side_b),
+                                     cacheable=lambda value: value['finished'])
+        response = {'message': 'Successfully calculated', 'unfinished': result['unfinished'],
+                    'matches': MatchSerializer(result['matches'], many=True).data}
+        for side, side_id in (('side_a', side_a), ('side_b', side_b)):
+            response[side] = dict(result[side], **{kind: serializer_class(sides[side_id]).data})
+        return Response(response, status=status.HTTP_200_OK)
+
+    def perform_update(self, serializer):
+        previous = copy(serializer.instance)
+        with transaction.atomic():
+            match = serializer.save()
+            update_match_rating(previous, match)
+        invalidate_stats(player_ids=match.matchperformance_set.values_list('player', flat=True),
+                         team_ids=(match.team1_id, match.team2_id))
+
     def create(self, request, *args, **kwargs):
         try:
             team1 = Team.objects.get(name=request.data['team1'])
             team2 = Team.objects.get(name=request.data['team2'])
             if team1 != team2:
                 match = Match.objects.create(team1=team1, team2=team2, time=request.data['time'])
+                invalidate_stats(team_ids=(team1.id, team2.id))
             else:
                 return Response({'message': 'Teams have to be unique'}, status=status.HTTP_400_BAD_REQUEST)
         except Team.DoesNotExist:
@@ -125,7 +188,13 @@ class MatchViewset(viewsets.ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
         if request.user.id == instance.team1.owner.id or request.user.id == instance.team2.owner.id:
-            self.perform_destroy(instance)
+            with transaction.atomic():
+                performances = list(MatchPerformance.objects.filter(match=instance))
+                invalidate_stats(team_ids=(instance.team1_id, instance.team2_id))
+                apply_performance_changes(removed=performances)
+                unrate_matches([instance])
+                self.perform_destroy(instance)
+                recompute_player_records({performance.player_id for performance in performances})
         else:
             return Response({'message': 'You are not owner of the match'}, status=status.HTTP_400_BAD_REQUEST)
         return Response({'message': 'Successfully deleted'}, status=status.HTTP_200_OK)
@@ -0,0 +1,86 @@
+import hashlib
+from operator import attrgetter
+
+from django.db.models import Count, Max
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from api.services.stats_export import OUTPUTS, export_lines, parse_export_filters
+
+
+class ConditionalGetMixin:
+    # updated_at columns the serialized payload depends on, related ones spelled as lookups
+    version_fields = ('updated_at',)
+
+    def get_object_versions(self, instance):
+        versions = []
+        for field in self.version_fields:
+            try:
+                versions.append(attrgetter(field.replace('__', '.'))(instance))
+            except AttributeError:
+                versions.append(None)
+        return versions
+
+    def get_collection_versions(self, queryset):
+        aggregates = {f'version_{i}': Max(field) for i, field in enumerate(self.version_fields)}
+        # a sliced queryset keeps its ordering, django aggregates over it as a subquery
+        if not queryset.query.is_sliced:
+            queryset = queryset.order_by()
+        versions = queryset.aggregate(count=Count('pk'), **aggregates)
+        return [versions.pop('count')] + list(versions.values())
+
+    def conditional_response(self, request, versions, build_response):
+        # answers 304 before anything gets serialized when the client already holds this version
+        timestamps = [version for version in versions if hasattr(version, 'timestamp')]
+        last_modified = int(max(timestamps).timestamp()) if timestamps else None
+        key = '|'.join([request.get_full_path()] + [str(version) for version in versions])
+        etag = quote_etag(hashlib.md5(key.encode()).hexdigest())
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = build_response()
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def conditional_detail(self, request, instance, build_response):
+        return self.conditional_response(request, self.get_object_versions(instance), build_response)
+
+    def conditional_list(self, request, queryset, build_response):
+        return self.conditional_response(request, self.get_collection_versions(queryset), build_response)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return self.conditional_detail(request, instance, lambda: Response(self.get_serializer(instance).data))
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional_list(request, queryset, lambda: super(ConditionalGetMixin, self).list(
+            request, *args, **kwargs))
+
+
+class ExportMixin:
+    # rows are streamed flat as they are read, ?output= because drf keeps ?format= for its renderers
+    export_kind = None
+
+    @action(methods=['GET'], detail=False)
+    def export(self, request):
+        params = self.request.query_params
+        output = params.get('output', 'csv')
+        try:
+            filters = parse_export_filters(params)
+        except ValueError:
+            return Response({'message': 'Wrong params'}, status=status.HTTP_400_BAD_REQUEST)
+        if output not in OUTPUTS:
+            return Response({'message': 'Output has to be csv or ndjson'}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(export_lines(self.export_kind, output, **filters),
+                                         content_type=OUTPUTS[output])
+        response['Content-Disposition'] = f'attachment; filename="{self.export_kind}.{output}"'
+        return response
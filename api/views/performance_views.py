@@ -1,43 +1,40 @@
-from django.db.models import Sum
+from copy import copy
+
+from django.db import transaction
+from django.db.models import F
 from rest_framework import viewsets, status
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
 
-from api.models import MatchPerformance, Player, PlayerRecords
+from api.models import MatchPerformance, Player
+from api.pagination import MatchPerformancePagination
 from api.serializers.serializers import PlayerSerializer
-from api.serializers.match_performance_serializers import MatchPerformanceSerializer, MatchPerformanceCreateSerializer
-
-EMPTY_RESULTS = {
-    'total_score': 0,
-    'total_score_balance': 0,
-    'serve': 0,
-    'serve_error': 0,
-    'serve_ace': 0,
-    'reception': 0,
-    'positive_reception': 0,
-    'reception_error': 0,
-    'positive_reception_percentage': 0,
-    'spike': 0,
-    'spike_point': 0,
-    'spike_block': 0,
-    'spike_error': 0,
-    'spike_kill_percentage': 0,
-    'spike_efficiency': 0,
-    'block_amount': 0,
-    'dig': 0,
-}
-
-
-class MatchPerformanceViewset(viewsets.ModelViewSet):
+from api.serializers.match_performance_serializers import MatchPerformanceSerializer, MatchPerformanceCreateSerializer, \
+    MatchPerformanceSheetSerializer
+from api.services.performance_stats import EMPTY_RESULTS, aggregate_performances, calculate_avg
+from api.services.performance_totals import apply_performance_changes, get_totals
+from api.services.player_records import recompute_player_records
+from api.services.ratings import rate_performances, unrate_performances
+from api.services.stats_cache import cached_stats
+from api.services.timeseries import TimeseriesError, performance_timeseries
+from api.views.mixins import ConditionalGetMixin, ExportMixin
+
+
+class MatchPerformanceViewset(ConditionalGetMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = MatchPerformance.objects.all()
     serializer_class = MatchPerformanceSerializer
     authentication_classes = (TokenAuthentication,)
     permission_classes = (IsAuthenticatedOrReadOnly,)
+    pagination_class = MatchPerformancePagination
+    version_fields = ('updated_at', 'player__updated_at', 'team__updated_at', 'match__updated_at',
+                      'match__team1__updated_at', 'match__team2__updated_at')
+    export_kind = 'performances'
 
     def get_queryset(self):
-        queryset = MatchPerformance.objects.all()
+        queryset = MatchPerformance.objects.select_related('player', 'match__team1', 'match__team2', 'team').annotate(
+            match_time=F('match__time'))
 
         player_id = self.request.query_params.get('player')
         if player_id is not None:
@@ -53,19 +50,42 @@ class MatchPerformanceViewset(viewsets.ModelViewSet):
 
         return queryset
 
+    def get_serializer_class(self):
+        if self.action in ('update', 'partial_update'):
+            return MatchPerformanceCreateSerializer
+        return super().get_serializer_class()
+
+    def perform_update(self, serializer):
+        previous = copy(serializer.instance)
+        with transaction.atomic():
+            performance = serializer.save()
+            apply_performance_changes(removed=[previous], added=[performance])
+            recompute_player_records({previous.player_id, performance.player_id})
+            unrate_performances([previous])
+            rate_performances(MatchPerformance.objects.filter(pk=performance.pk))
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            apply_performance_changes(removed=[instance])
+            unrate_performances([instance])
+            instance.delete()
+            recompute_player_records({instance.player_id})
+
     @action(methods=['GET'], detail=False)
     def get_avg_team_performance(self, request):
         team_id = self.request.query_params.get('team')
         if team_id is not None:
-            queryset = MatchPerformance.objects.all()
-            queryset = queryset.filter(team=team_id)
-
             # works for performances not matches
+            team_id = int(team_id)
             performances_amount = self.request.query_params.get('amount')
             if performances_amount is not None:
-                queryset = queryset[:int(performances_amount)]
-
-            results = self.calculate_avg(queryset, len(queryset))
+                performances_amount = int(performances_amount)
+                queryset = MatchPerformance.objects.filter(team=team_id).order_by('-match__time')
+                totals = cached_stats('avg', lambda: aggregate_performances(queryset[:performances_amount]),
+                                      team_id=team_id, amount=performances_amount)
+            else:
+                totals = cached_stats('avg', lambda: get_totals(team_id=team_id), team_id=team_id)
+            results = calculate_avg(totals, totals['performances'])
 
             response = {'message': 'Successfully calculated', 'results': results}
             return Response(response, status=status.HTTP_200_OK)
@@ -80,21 +100,27 @@ class MatchPerformanceViewset(viewsets.ModelViewSet):
         if player_id is not None:
             player = Player.objects.get(id=player_id)
             if team_id is not None:
-                queryset = MatchPerformance.objects.filter(player=player, team=team_id)
+                team_id = int(team_id)
+            performances_amount = self.request.query_params.get('amount')
+            if performances_amount is not None:
+                performances_amount = int(performances_amount)
+                if team_id is not None:
+                    queryset = MatchPerformance.objects.filter(player=player, team=team_id)
+                else:
+                    queryset = MatchPerformance.objects.filter(player=player)
+                queryset = queryset.order_by("-match__time")
+                totals = cached_stats('avg', lambda: aggregate_performances(queryset[:performances_amount]),
+                                      player_id=player.id, team_id=team_id, amount=performances_amount)
             else:
-                queryset = MatchPerformance.objects.filter(player=player)
-            if not queryset.exists():
+                totals = cached_stats('avg', lambda: get_totals(player_id=player.id, team_id=team_id),
+                                      player_id=player.id, team_id=team_id)
+            if not totals['performances']:
                 response = {'message': 'Player has no performances', 'results': EMPTY_RESULTS, 'set_amount': 0,
                             'player': PlayerSerializer(player).data}
                 return Response(response, status=status.HTTP_200_OK)
-            queryset = queryset.order_by("-match__time")
 
-            performances_amount = self.request.query_params.get('amount')
-            if performances_amount is not None:
-                queryset = queryset[:int(performances_amount)]
-
-            set_amount = self.count_sets(queryset)
-            results = self.calculate_avg(queryset, set_amount)
+            set_amount = totals['sets']
+            results = calculate_avg(totals, set_amount)
 
             response = {'message': 'Successfully calculated', 'results': results, 'set_amount': set_amount,
                         'player': PlayerSerializer(player).data}
@@ -103,134 +129,35 @@ class MatchPerformanceViewset(viewsets.ModelViewSet):
             response = {'message': 'Wrong params'}
             return Response(response, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(methods=['GET'], detail=False)
+    def timeseries(self, request):
+        params = self.request.query_params
+        try:
+            options = {
+                'player_id': int(params['player']),
+                'stat': params.get('stat', 'total_score'),
+                'window': int(params.get('window', 5)),
+                'bucket': params.get('bucket', 'match'),
+                'points': int(params['points']) if 'points' in params else None,
+                'team_id': int(params['team']) if 'team' in params else None,
+            }
+        except (KeyError, ValueError):
+            return Response({'message': 'Wrong params'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # a handful of points instead of the whole nested performance list the charts used to pull
+        name = 'timeseries:{stat}:{window}:{bucket}:{points}'.format(**options)
+        try:
+            series = cached_stats(name, lambda: performance_timeseries(**options), player_id=options['player_id'],
+                                  team_id=options['team_id'])
+        except TimeseriesError as e:
+            return Response({'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        response = {'message': 'Successfully calculated', 'stat': options['stat'], 'window': options['window'],
+                    'bucket': options['bucket'], 'results': series}
+        return Response(response, status=status.HTTP_200_OK)
+
     def create(self, request, *args, **kwargs):
-        for data in request.data:
-            serializer = MatchPerformanceCreateSerializer(data=data)
-            data = serializer.initial_data
-            existing_object = MatchPerformance.objects.filter(
-                player=data.get('player'),
-                match=data.get('match')
-            ).first()
-
-            if existing_object:
-                serializer_existing = MatchPerformanceCreateSerializer(existing_object, data=data)
-                if serializer_existing.is_valid():
-                    serializer_existing.save()
-                    self.update_player_record(performance=serializer_existing.validated_data)
-                else:
-                    return Response(serializer_existing.errors, status=status.HTTP_400_BAD_REQUEST)
-            else:
-                if serializer.is_valid():
-                    serializer.save()
-                    self.update_player_record(performance=serializer.validated_data)
-                else:
-                    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        return Response('Performances successfully added', status=status.HTTP_200_OK)
-
-
-    def count_sets(self, queryset):
-        set_amount = 0
-        for performance in queryset:
-            for i in range(5):
-                set_position_attr = f"set{i + 1}_position"
-                if getattr(performance, set_position_attr, None):
-                    set_amount += 1
-        return set_amount
-
-
-    def calculate_avg(self, queryset, divider):
-        serve = queryset.aggregate(Sum('serve'))['serve__sum']
-        serve_error = queryset.aggregate(Sum('serve_error'))['serve_error__sum']
-        serve_ace = queryset.aggregate(Sum('serve_ace'))['serve_ace__sum']
-        reception = queryset.aggregate(Sum('reception'))['reception__sum']
-        positive_reception = queryset.aggregate(Sum('positive_reception'))['positive_reception__sum']
-        reception_error = queryset.aggregate(Sum('reception_error'))['reception_error__sum']
-        spike = queryset.aggregate(Sum('spike'))['spike__sum']
-        spike_point = queryset.aggregate(Sum('spike_point'))['spike_point__sum']
-        spike_block = queryset.aggregate(Sum('spike_block'))['spike_block__sum']
-        spike_error = queryset.aggregate(Sum('spike_error'))['spike_error__sum']
-        block_amount = queryset.aggregate(Sum('block_amount'))['block_amount__sum']
-        dig = queryset.aggregate(Sum('dig'))['dig__sum']
-
-        total_score = spike_point + serve_ace + block_amount
-        total_score_balance = total_score - serve_error - reception_error - spike_error - spike_block
-        if reception:
-            positive_reception_percentage = round((positive_reception / reception) * 100)
-        else:
-            positive_reception_percentage = 0
-        if spike:
-            spike_kill_percentage = round((spike_point / spike) * 100)
-            spike_efficiency = round(((spike_point - spike_error - spike_block) / spike) * 100)
-        else:
-            spike_kill_percentage = 0
-            spike_efficiency = 0
-
-        results = {
-            'total_score': round(total_score / divider, 2),
-            'total_score_balance': round(total_score_balance / divider, 2),
-            'serve': round(serve / divider, 2),
-            'serve_error': round(serve_error / divider, 2),
-            'serve_ace': round(serve_ace / divider, 2),
-            'reception': round(reception / divider, 2),
-            'positive_reception': round(positive_reception / divider, 2),
-            'reception_error': round(reception_error / divider, 2),
-            'positive_reception_percentage': round(positive_reception_percentage, 2),
-            'spike': round(spike / divider, 2),
-            'spike_point': round(spike_point / divider, 2),
-            'spike_block': round(spike_block / divider, 2),
-            'spike_error': round(spike_error / divider, 2),
-            'spike_kill_percentage': round(spike_kill_percentage, 2),
-            'spike_efficiency': round(spike_efficiency, 2),
-            'block_amount': round(block_amount / divider, 2),
-            'dig': round(dig / divider, 2),
-        }
-
-        return results
-
-
-    def update_player_record(self, performance):
-        player_record = PlayerRecords.objects.filter(player=performance.get('player')).first()
-        match = performance.get('match')
-        if not player_record:
-            player_record = PlayerRecords.objects.create(player=performance.get('player'))
-        if performance.get('serve', 0) > player_record.serve:
-            player_record.serve = performance['serve']
-            player_record.serve_match = match
-
-        if performance.get('serve_error', 0) > player_record.serve_error:
-            player_record.serve_error = performance['serve_error']
-            player_record.serve_error_match = match
-
-        if performance.get('serve_ace', 0) > player_record.serve_ace:
-            player_record.serve_ace = performance['serve_ace']
-            player_record.serve_ace_match = match
-
-        if performance.get('reception', 0) > player_record.reception:
-            player_record.reception = performance['reception']
-            player_record.reception_match = match
-
-        if performance.get('positive_reception', 0) > player_record.positive_reception:
-            player_record.positive_reception = performance['positive_reception']
-            player_record.positive_reception_match = match
-
-        if performance.get('reception_error', 0) > player_record.reception_error:
-            player_record.reception_error = performance['reception_error']
-            player_record.reception_error_match = match
-
-        if performance.get('spike', 0) > player_record.spike:
-            player_record.spike = performance['spike']
-            player_record.spike_match = match
-
-        if performance.get('spike_point', 0) > player_record.spike_point:
-            player_record.spike_point = performance['spike_point']
-            player_record.spike_point_match = match
-
-        if performance.get('block_amount', 0) > player_record.block_amount:
-            player_record.block_amount = performance['block_amount']
-            player_record.block_amount_match = match
-
-        if performance.get('dig', 0) > player_record.dig:
-            player_record.dig = performance['dig']
-            player_record.dig_match = match
-
-        player_record.save()
+        serializer = MatchPerformanceSheetSerializer(data=request.data, many=True)
+        if serializer.is_valid():
+            serializer.save()
+            return Response('Performances successfully added', status=status.HTTP_200_OK)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from rest_framework import viewsets, status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.response import Response
+
+from api.models import Team
+from api.serializers.serializers import TeamSerializer
+from api.services.standings import compute_standings, day_start
+
+
+class StandingsViewset(viewsets.ViewSet):
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticatedOrReadOnly,)
+
+    def list(self, request):
+        params = self.request.query_params
+        try:
+            team_ids = [int(team_id) for team_id in params['teams'].split(',')] if 'teams' in params else None
+            # both ends are days, to is inclusive
+            start = day_start(params['from']) if 'from' in params else None
+            end = day_start(params['to']) + timedelta(days=1) if 'to' in params else None
+        except ValueError:
+            return Response({'message': 'Wrong params'}, status=status.HTTP_400_BAD_REQUEST)
+
+        standings = compute_standings(team_ids, start, end)
+        teams = Team.objects.in_bulk([row['team'] for row in standings])
+        results = [dict(row, team=TeamSerializer(teams[row['team']]).data) for row in standings if row['team'] in teams]
+        return Response({'message': 'Successfully calculated', 'results': results}, status=status.HTTP_200_OK)
@@ -1,18 +1,27 @@
+from django.db import transaction
+from django.db.models import F, Q
 from django.shortcuts import get_object_or_404
 from rest_framework import viewsets, status
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from api.models import Team, Player, UserProfile, PlayerMembership
+from api.models import Team, Player, UserProfile, PlayerMembership, Match, MatchPerformance, normalize_team_name
+from api.pagination import TeamPagination
 from api.serializers.serializers import TeamSerializer, TeamPlayerSerializer, TeamFullSerializer
+from api.services.performance_totals import apply_performance_changes
+from api.services.player_records import recompute_player_records
+from api.services.ratings import unrate_matches
+from api.services.stats_cache import invalidate_all_stats
+from api.views.mixins import ConditionalGetMixin
 
 
-class TeamViewset(viewsets.ModelViewSet):
+class TeamViewset(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Team.objects.all()
     serializer_class = TeamSerializer
     authentication_classes = (TokenAuthentication,)
     permission_classes = (IsAuthenticatedOrReadOnly,)
+    pagination_class = TeamPagination
 
     def get_queryset(self):
         queryset = Team.objects.all()
@@ -21,7 +30,7 @@ class TeamViewset(viewsets.ModelViewSet):
             player = get_object_or_404(Player, id=player_id)
             queryset = queryset.filter(players__id=player.id)
         team_amount = int(self.request.query_params.get('amount', 0))
-        if team_amount:
+        if team_amount and not self.paginator.is_requested(self.request):
             queryset = queryset[:team_amount]
         return queryset
 
@@ -31,24 +40,28 @@ class TeamViewset(viewsets.ModelViewSet):
         team_amount = int(self.request.query_params.get('amount', 0))
         if player_id is not None:
             player = get_object_or_404(Player, id=player_id)
-            queryset = queryset.filter(players__id=player.id)
-            if team_amount:
-                queryset = queryset[:team_amount]
-            serializer = TeamPlayerSerializer(queryset, many=True, context={'player_id': player_id})
+            queryset = queryset.filter(playermembership__player=player).annotate(
+                date_joined=F('playermembership__date_joined'), date_left=F('playermembership__date_left'))
+            serializer_class = TeamPlayerSerializer
         else:
             order = self.request.query_params.get('order')
             if order == 'desc':
                 queryset = queryset.order_by('-id')
-            team_amount = int(self.request.query_params.get('amount', 0))
-            if team_amount:
-                queryset = queryset[:team_amount]
-            serializer = TeamSerializer(queryset, many=True)
-        return Response(serializer.data)
+            serializer_class = TeamSerializer
+
+        if team_amount and not self.paginator.is_requested(request):
+            queryset = queryset[:team_amount]
+
+        def build_response():
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                return self.get_paginated_response(serializer_class(page, many=True).data)
+            return Response(serializer_class(queryset, many=True).data)
+        return self.conditional_list(request, queryset, build_response)
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-        serializer = TeamFullSerializer(instance, many=False)
-        return Response(serializer.data)
+        return self.conditional_detail(request, instance, lambda: Response(TeamFullSerializer(instance).data))
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -58,10 +71,24 @@ class TeamViewset(viewsets.ModelViewSet):
         PlayerMembership.objects.create(player=player, team=team)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    def perform_update(self, serializer):
+        renamed = serializer.validated_data.get('name', serializer.instance.name) != serializer.instance.name
+        serializer.save()
+        if renamed:
+            # cached records and head to heads carry the names of the teams in their matches, whoever they belong to
+            invalidate_all_stats()
+
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
         if request.user.id == instance.owner.id:
-            self.perform_destroy(instance)
+            with transaction.atomic():
+                # matches of the team are deleted with it, together with the opponents' performances
+                performances = list(MatchPerformance.objects.filter(
+                    Q(team=instance) | Q(match__team1=instance) | Q(match__team2=instance)))
+                apply_performance_changes(removed=performances)
+                unrate_matches(Match.objects.filter(Q(team1=instance) | Q(team2=instance), rating_change__isnull=False))
+                self.perform_destroy(instance)
+                recompute_player_records({performance.player_id for performance in performances})
         else:
             return Response({'message': 'You are not owner of the team'}, status=status.HTTP_400_BAD_REQUEST)
         return Response({'message': 'Successfully deleted'}, status=status.HTTP_200_OK)
@@ -75,6 +102,24 @@ class TeamViewset(viewsets.ModelViewSet):
             teams = Team.objects.all().values_list('name', flat=True)
         return Response(teams, status=status.HTTP_200_OK)
 
+    @action(methods=['GET'], detail=False)
+    def autocomplete(self, request):
+        prefix = normalize_team_name(self.request.query_params.get('q', ''))
+        owner_id = self.request.query_params.get('owner')
+        try:
+            limit = min(int(self.request.query_params.get('limit', 10)), 50)
+        except ValueError:
+            return Response({'message': 'Wrong params'}, status=status.HTTP_400_BAD_REQUEST)
+        if owner_id is not None and not owner_id.isdigit():
+            return Response({'message': 'Wrong params'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # a range over the casefolded names instead of LIKE, so the prefix is an index seek
+        teams = Team.objects.filter(normalized_name__gte=prefix, normalized_name__lt=prefix + '\U0010ffff')
+        if owner_id is not None:
+            teams = teams.filter(owner=owner_id)
+        teams = teams.order_by('normalized_name', 'id').values('id', 'name')[:max(limit, 1)]
+        return Response(list(teams), status=status.HTTP_200_OK)
+
     @action(methods=['GET'], detail=False)
     def get_team_by_name(self, request):
         name = self.request.query_params.get('name')
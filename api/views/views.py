@@ -1,4 +1,5 @@
 from datetime import date
+from django.db import transaction
 from django.db.models import Q
 from django.contrib.contenttypes.models import ContentType
 from rest_framework import viewsets, status
@@ -8,11 +9,18 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.contrib.auth.models import User
 from api.models import Player, Team, UserProfile, PlayerMembership, Comment, TeamInvitation, PlayerRecords, \
-    UserFriendship, UserFriendshipInvitation
+    UserFriendship, UserFriendshipInvitation, MatchPerformance
+from api.pagination import CommentPagination, PlayerPagination
 from api.serializers.player_records_serializers import PlayerRecordsSerializer
 from api.serializers.serializers import PlayerSerializer, UserSerializer, UserProfileSerializer, \
     ChangePasswordSerializer, MemberSerializer, CommentSerializer, TeamInvitationSerializer, \
     PlayerFullSerializer, UserFriendshipSerializer, UserFriendshipInvitationSerializer
+from api.services.performance_totals import apply_performance_changes
+from api.services.player_search import search_players
+from api.services.ratings import unrate_performances
+from api.services.stats_cache import cached_stats, invalidate_stats
+from api.services.versions import touch, touch_commented_object, touch_player_teams, touch_user_players
+from api.views.mixins import ConditionalGetMixin
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAuthenticatedOrReadOnly
 
@@ -44,11 +52,12 @@ class UserProfileViewset(viewsets.ModelViewSet):
     permission_classes = (IsAuthenticatedOrReadOnly,)
 
 
-class PlayerViewset(viewsets.ModelViewSet):
+class PlayerViewset(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Player.objects.all()
     serializer_class = PlayerSerializer
     authentication_classes = (TokenAuthentication,)
     permission_classes = (IsAuthenticatedOrReadOnly,)
+    pagination_class = PlayerPagination
 
     def get_queryset(self):
         queryset = Player.objects.all()
@@ -56,14 +65,32 @@ class PlayerViewset(viewsets.ModelViewSet):
         if order == 'desc':
             queryset = queryset.order_by('-id')
         player_amount = int(self.request.query_params.get('amount', 0))
-        if player_amount:
+        if player_amount and not self.paginator.is_requested(self.request):
             queryset = queryset[:player_amount]
         return queryset
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-        serializer = PlayerFullSerializer(instance, many=False, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+
+        def build_response():
+            serializer = PlayerFullSerializer(instance, many=False, context={'request': request})
+            return Response(serializer.data, status=status.HTTP_200_OK)
+        return self.conditional_detail(request, instance, build_response)
+
+    def perform_update(self, serializer):
+        player = serializer.save()
+        # team details list their active players
+        touch_player_teams(player)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            # the performances are deleted with the player, their stats leave the team totals too
+            performances = list(MatchPerformance.objects.filter(player=instance))
+            apply_performance_changes(removed=performances)
+            unrate_performances(performances)
+            invalidate_stats(team_ids=instance.team_set.values_list('id', flat=True))
+            touch_player_teams(instance)
+            instance.delete()
 
     @action(methods=['GET'], detail=False)
     def get_player_by_name(self, request):
@@ -76,20 +103,51 @@ class PlayerViewset(viewsets.ModelViewSet):
             return Response({'message': 'Bad player data'}, status=status.HTTP_400_BAD_REQUEST)
         return Response({'message': 'Provide name param'}, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(methods=['GET'], detail=False)
+    def search(self, request):
+        query = self.request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'message': 'Provide q param'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(int(self.request.query_params.get('limit', 10)), 50)
+        except ValueError:
+            return Response({'message': 'Wrong params'}, status=status.HTTP_400_BAD_REQUEST)
+        players = search_players(query, max(limit, 1))
+        return Response(PlayerSerializer(players, many=True).data, status=status.HTTP_200_OK)
+
 
-class CommentViewset(viewsets.ModelViewSet):
+class CommentViewset(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
     authentication_classes = (TokenAuthentication,)
     permission_classes = (IsAuthenticatedOrReadOnly,)
+    pagination_class = CommentPagination
+    version_fields = ('updated_at', 'user__profile__player__updated_at')
+
+    def get_queryset(self):
+        queryset = Comment.objects.select_related('user__profile__player')
+        content_type_name = self.request.query_params.get('content_type')
+        if content_type_name is not None:
+            try:
+                content_type = ContentType.objects.get_by_natural_key('api', content_type_name)
+            except ContentType.DoesNotExist:
+                return queryset.none()
+            queryset = queryset.filter(content_type=content_type)
+        object_id = self.request.query_params.get('object_id')
+        if object_id is not None:
+            if not object_id.isdigit():
+                return queryset.none()
+            queryset = queryset.filter(object_id=object_id)
+        return queryset
 
     def create(self, request, *args, **kwargs):
         data = request.data
         content_type_name = data.get('content_type')
-        content_type = ContentType.objects.get(model=content_type_name)
+        content_type = ContentType.objects.get_by_natural_key('api', content_type_name)
         user = User.objects.get(pk=data.get('user'))
         comment = Comment.objects.create(content_type=content_type, user=user, object_id=data.get('object_id'),
                                          description=data.get('description'))
+        touch_commented_object(content_type, comment.object_id)
         result = CommentSerializer(comment, many=False)
         return Response({'message': 'Comment added', 'result': result.data}, status=status.HTTP_200_OK)
 
@@ -105,6 +163,7 @@ class CommentViewset(viewsets.ModelViewSet):
                 comment = Comment.objects.get(pk=comment_id)
                 if comment.user == request.user:
                     comment.delete()
+                    touch_commented_object(comment.content_type, comment.object_id)
                     response = {'message': 'Successfully deleted'}
                     return Response(response, status=status.HTTP_200_OK)
                 else:
@@ -131,10 +190,12 @@ class MemberViewset(viewsets.ModelViewSet):
                 member = PlayerMembership.objects.get(player=player, team=team)
                 member.date_left = None
                 member.save()
+                touch(Team.objects.filter(pk=team.id))
                 response = {'message': 'Rejoined team'}
                 return Response(response, status=status.HTTP_200_OK)
 
             member = PlayerMembership.objects.create(player=player, team=team)
+            touch(Team.objects.filter(pk=team.id))
             serializer = MemberSerializer(member, many=False)
             response = {'message': 'Added to team', 'results': serializer.data}
             return Response(response, status=status.HTTP_201_CREATED)
@@ -151,6 +212,7 @@ class MemberViewset(viewsets.ModelViewSet):
             member = PlayerMembership.objects.get(player=player, team=team)
             member.date_left = date.today()
             member.save()
+            touch(Team.objects.filter(pk=team.id))
             response = {'message': 'Removed from team'}
             return Response(response, status=status.HTTP_200_OK)
         else:
@@ -223,6 +285,15 @@ class PlayerRecordsViewset(viewsets.ModelViewSet):
             return PlayerRecords.objects.filter(player=player_id)
         return PlayerRecords.objects.all()
 
+    def list(self, request, *args, **kwargs):
+        player_id = self.request.query_params.get('player')
+        if player_id is None:
+            return super().list(request, *args, **kwargs)
+        # records only change with the player's performances
+        data = cached_stats('records', lambda: list(super(PlayerRecordsViewset, self).list(request).data),
+                            player_id=int(player_id))
+        return Response(data)
+
 
 class UserFriendshipViewset(viewsets.ModelViewSet):
     queryset = UserFriendship.objects.all()
@@ -258,6 +329,7 @@ class UserFriendshipViewset(viewsets.ModelViewSet):
                 Q(user1=request.data['user1'], user2=request.data['user2']) |
                 Q(user1=request.data['user2'], user2=request.data['user1']))
             friendship.delete()
+            touch_user_players(friendship.user1_id, friendship.user2_id)
             return Response({'message': 'Successfully deleted'}, status=status.HTTP_200_OK)
         except UserFriendship.DoesNotExist:
             response = {'message': 'Friendship does not exist'}
@@ -279,6 +351,7 @@ class UserFriendshipViewset(viewsets.ModelViewSet):
                 return Response({'message': 'Friendship already exist'}, status=status.HTTP_200_OK)
 
             UserFriendship.objects.create(user1=user1, user2=user2)
+            touch_user_players(user1, user2)
             return Response({'message': 'Friendship created'}, status=status.HTTP_201_CREATED)
         except User.DoesNotExist:
             return Response({'message': 'Provided users not exist'}, status=status.HTTP_400_BAD_REQUEST)
@@ -312,6 +385,7 @@ class UserFriendshipInvitationViewset(viewsets.ModelViewSet):
             invitee_invitation = UserFriendshipInvitation.objects.filter(inviter=invitee, invitee=inviter).first()
             if invitee_invitation:
                 UserFriendship.objects.create(user1=inviter, user2=invitee)
+                touch_user_players(inviter, invitee)
                 invitee_invitation.delete()
                 return Response({'message': 'Invitee already invited you. Friendship created'},
                                 status=status.HTTP_201_CREATED)
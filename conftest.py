@@ -0,0 +1,9 @@
+import pytest
+from django.core.cache import caches
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # cached entries are keyed by ids, which the rolled back test databases hand out again
+    for cache in caches.all():
+        cache.clear()